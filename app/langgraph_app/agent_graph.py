@@ -1,49 +1,140 @@
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, START
-from langchain_core.messages import RemoveMessage, SystemMessage
-from tavily import TavilyClient
-from langgraph.prebuilt import tools_condition, ToolNode
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from tavily import AsyncTavilyClient
+from langgraph.prebuilt import tools_condition
+from langgraph.config import get_config, get_stream_writer
+import asyncio
 import os
+import time
+from collections import OrderedDict
 from langgraph_app.rag_pipeline import *
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph_app.checkpointer import build_checkpoint_store
+from langgraph_app.tokens import message_text, messages_tokens
+from langgraph_app.prompt_builder import build_chat_history, record_prompt
+from langgraph_app.tool_compaction import compact_documents, compact_web_results
+from langgraph_app.tool_executor import ParallelToolNode
+from langgraph_app.retrieval_planner import plan_subqueries, wants_decomposition
+from langgraph_app.web_search import CachedWebSearch, FakeTavilyClient
+from langgraph_app.metrics import GraphInstrumentation, record_llm_usage
+from langgraph_app.lazy import LazyResource
 from langgraph_app.prompts import *
 from langgraph_app.state import *
+from langgraph_app.llm_pool import LLMPool
+from langgraph_app.intent_classifier import build_intent_classifier, classify_by_rules, normalize_intent
+from langgraph_app.answer_cache import SemanticAnswerCache, InMemoryAnswerCacheBackend, depends_on_history, normalize_query
 
 _ = load_dotenv()
 
-tavily_client = TavilyClient(os.getenv("TAVILY_API_KEY"))
+# WEB_SEARCH_BACKEND=fake swaps Tavily for an offline client (local runs, benchmarks).
+def build_tavily_client():
+    if os.getenv("WEB_SEARCH_BACKEND", "tavily") == "fake":
+        return FakeTavilyClient(latency=float(os.getenv("FAKE_TAVILY_LATENCY", "0.5")))
+    return AsyncTavilyClient(os.getenv("TAVILY_API_KEY"))
+
+# Web search is optional for readiness: answers degrade without it.
+tavily_client = LazyResource("tavily", build_tavily_client, required=False)
+web_search = CachedWebSearch(
+    tavily_client,
+    ttl=float(os.getenv("WEB_SEARCH_CACHE_TTL", "900")),
+    max_entries=int(os.getenv("WEB_SEARCH_CACHE_SIZE", "1000")),
+)
 
 def format_chat_history(messages: list[dict]) -> str:
     return "\n".join(
         f"{m.role.capitalize()}: {m['content'].strip()}" for m in messages
     )
 
-def web_search_tool(query : str) -> str:
+def progress(message : str):
+    """Emit a progress event on the custom stream (no-op outside astream)."""
+    writer = get_stream_writer()
+    writer({"event" : "progress", "message" : message})
+
+async def web_search_tool(query : str) -> str:
     """Search on the web for answers
 
     Args: 
         query : str
     """
-    print("Searching the web..")
-    response = tavily_client.search(query)
-    return response["results"]
+    progress("Searching the web...")
+    response = await web_search.search(query)
+    return compact_web_results(query, response["results"])
+
+async def retrieve_context(query : str, intent : str | None) -> str:
+    subqueries = plan_subqueries(query) if wants_decomposition(query, intent) else [query]
+    if len(subqueries) > 1:
+        # One concurrent search per compared policy, merged so each is represented.
+        progress(f"Retrieving context for {len(subqueries)} policies...")
+        retrieved_docs = await amulti_retrival_pipeline(subqueries)
+        return compact_documents(query, retrieved_docs, max_results=len(retrieved_docs))
+
+    progress("Retrieving context...")
+    retrieved_docs = await aretrival_pipeline(query)
+    return compact_documents(query, retrieved_docs)
+
+# Context prefetched for the raw user query, by normalized query, so a tool
+# call that repeats the question is answered without searching again.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "300"))
+PREFETCH_CACHE_SIZE = 512
+prefetched_results : OrderedDict[str, tuple[float, str]] = OrderedDict()
 
-def context_retriever(query : str) -> str:
+def remember_prefetch(query : str, context : str):
+    key = normalize_query(query)
+    prefetched_results[key] = (time.time() + PREFETCH_TTL, context)
+    prefetched_results.move_to_end(key)
+    while len(prefetched_results) > PREFETCH_CACHE_SIZE:
+        prefetched_results.popitem(last=False)
+
+def recall_prefetch(query : str) -> str | None:
+    entry = prefetched_results.get(normalize_query(query))
+    if entry is None or entry[0] < time.time():
+        return None
+    return entry[1]
+
+async def context_retriever(query : str) -> str:
     """ Fectches documents from vectorDB
 
     Args:
         query : str
     """
-    print("Retrieving context...")
-    retrieved_docs = retrival_pipeline(query)
-    return retrieved_docs
+    prefetched = recall_prefetch(query)
+    if prefetched is not None:
+        return prefetched
+    intent = get_config().get("configurable", {}).get("intent")
+    return await retrieve_context(query, intent)
 
 tools = [web_search_tool, context_retriever]
 
-def llm_node(state : AgentState, config):
-    clean_messages = state["messages"]
-    
+# Tool calls in one turn run concurrently; each is cut off at its timeout.
+tool_node = ParallelToolNode(
+    tools,
+    timeouts={
+        "web_search_tool" : float(os.getenv("WEB_SEARCH_TIMEOUT", "8")),
+        "context_retriever" : float(os.getenv("CONTEXT_RETRIEVER_TIMEOUT", "10")),
+    },
+    default_timeout=float(os.getenv("TOOL_TIMEOUT", "15")),
+)
+
+LLM_MODEL = "gemini-2.5-flash-lite"
+llm_pool = LLMPool(tools, max_size=int(os.getenv("LLM_POOL_SIZE", "32")), answer_schema=IntentAnswer)
+intent_classifier = build_intent_classifier(
+    threshold=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8")),
+    centroid_model=os.getenv("INTENT_CENTROID_MODEL"),
+)
+
+answer_cache = None
+if os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true":
+    answer_cache = SemanticAnswerCache(
+        embeddings,
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+        backend=InMemoryAnswerCacheBackend(max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1000"))),
+    )
+
+async def llm_node(state : AgentState, config):
+    clean_messages = build_chat_history(state, state["intent"])
+
     if state["intent"] == "eli5":
         prompt = ELI5_Prompt.format(chat_history = clean_messages)
     elif state["intent"] == "extract_entities":
@@ -53,47 +144,191 @@ def llm_node(state : AgentState, config):
     elif state["intent"] == "policy_comparison":
         prompt = Policy_Comparison_Prompt.format(chat_history = clean_messages)
 
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0, google_api_key=config["metadata"]["api_key"])
-    llm_with_tools = llm.bind_tools(tools)
+    record_prompt(state, state["intent"], clean_messages, prompt)
+    llm_with_tools = llm_pool.get(LLM_MODEL, config["metadata"]["api_key"]).llm_with_tools
 
-    response = llm_with_tools.invoke(prompt,config=config)
+    response = await llm_with_tools.ainvoke(prompt,config=config)
+    record_llm_usage(state["intent"], response)
     return {"response" : response.content, "messages" : response}
 
-def intent_handler(state : AgentInputState, config):
+async def intent_handler(state : AgentInputState, config):
     user_query = state["messages"][-1].content
+
+    intent, _, _ = await intent_classifier.aclassify(user_query)
+    if intent is not None:
+        return {"intent" : intent, "query" : user_query}
+
     prompt = Intent_Handler_Prompt.format(query = user_query)
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0, google_api_key=config["metadata"]["api_key"])
-    response = llm.invoke(prompt,config=config)
-    intent = response.content
+    llm = llm_pool.get(LLM_MODEL, config["metadata"]["api_key"]).llm
+    response = await llm.ainvoke(prompt,config=config)
+    record_llm_usage("intent_classification", response)
+    intent = normalize_intent(response.content)
     return {"intent" : intent, "query" : user_query, "messages" : response}
 
-def summarize_node(state : AgentInputState, config):
-    if(len(state["messages"]) > 10):
-        prompt = summary_prompt.format(last_9_messages = state["messages"][:-2])
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0, google_api_key=config["metadata"]["api_key"])
-        summary = response = llm.invoke(prompt,config=config)
-        system_message = f"Summary of conversation earlier : {summary}"
-        delete_messages = [RemoveMessage(id=m.id) for m in state["messages"][:-2]]
-        delete_messages = [SystemMessage(content=system_message)] + delete_messages
-        return {"messages" : delete_messages}
+async def local_intent_node(state : AgentInputState, config):
+    # Single-call mode: never spend an LLM call on classification. A low
+    # confidence leaves intent unset and fused_node picks it while answering.
+    user_query = state["messages"][-1].content
+    intent, _, _ = await intent_classifier.aclassify(user_query)
+    return {"intent" : intent, "query" : user_query}
+
+async def fused_node(state : AgentState, config):
+    chat_history = build_chat_history(state, "fused")
+    prompt = Fused_Intent_Answer_Prompt.format(chat_history = chat_history)
+    record_prompt(state, "fused", chat_history, prompt)
+    llm_with_answer = llm_pool.get(LLM_MODEL, config["metadata"]["api_key"]).llm_with_answer
+
+    response = await llm_with_answer.ainvoke(prompt,config=config)
+    record_llm_usage(state.get("intent") or "fused", response)
+    tool_calls = [c for c in response.tool_calls if c["name"] != IntentAnswer.__name__]
+    if tool_calls:
+        response.tool_calls = tool_calls
+        return {"messages" : response}
+
+    answers = [c for c in response.tool_calls if c["name"] == IntentAnswer.__name__]
+    if not answers:
+        return {"intent" : "general_qa", "response" : response.content, "messages" : response}
 
-    return
+    # Store the answer as a plain AI message so history never carries an
+    # unanswered IntentAnswer tool call.
+    answer = IntentAnswer(**answers[0]["args"])
+    message = AIMessage(content=answer.answer, id=response.id, usage_metadata=response.usage_metadata)
+    return {"intent" : answer.intent, "response" : answer.answer, "messages" : message}
+
+async def prefetch_node(state : AgentInputState, config):
+    """Retrieves for the raw user query while intent_handler classifies it."""
+    user_query = state["messages"][-1].content
+    rule_intent, _ = classify_by_rules(user_query)
+    # Entity extraction works from the user's text only, and follow-ups like
+    # "what about its penalties?" retrieve poorly without the earlier turns.
+    if rule_intent == "extract_entities" or depends_on_history(user_query, len(state["messages"]) > 1):
+        return {"context" : None}
+
+    try:
+        context = await asyncio.wait_for(
+            retrieve_context(user_query, rule_intent), tool_node.timeout_for("context_retriever")
+        )
+    except Exception as e:
+        print(f"Retrieval prefetch failed: {e!r}")
+        return {"context" : None}
+    remember_prefetch(user_query, context)
+    return {"context" : context}
+
+def route_by_intent(state : AgentState):
+    return "llm_node" if state.get("intent") else "fused_node"
+
+# "background" folds old turns into the summary after the response is sent
+# (summarize_session); "inline" does it in summarize_node before llm_node.
+# In background mode summarize_node only steps in above the hard limit.
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "background")
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "6000"))
+SUMMARY_HARD_LIMIT_TOKENS = int(os.getenv("SUMMARY_HARD_LIMIT_TOKENS", str(3 * SUMMARY_TRIGGER_TOKENS)))
+SUMMARY_KEEP_MESSAGES = int(os.getenv("SUMMARY_KEEP_MESSAGES", "6"))
+
+def summary_cut(messages : list, keep : int) -> int:
+    # The kept window starts at a user message so tool calls stay paired with their results.
+    cut = max(len(messages) - keep, 0)
+    while cut > 0 and not isinstance(messages[cut], HumanMessage):
+        cut -= 1
+    return cut
+
+async def fold_summary(state : AgentState, api_key : str, trigger_tokens : int, config = None):
+    """Folds only the messages older than the keep window into the existing summary."""
+    messages = state.get("messages", [])
+    if messages_tokens(messages) <= trigger_tokens:
+        return None
+    cut = summary_cut(messages, SUMMARY_KEEP_MESSAGES)
+    if cut == 0:
+        return None
+
+    old_messages = messages[:cut]
+    prompt = rolling_summary_prompt.format(
+        summary = state.get("summary") or "(none yet)",
+        new_messages = "\n".join(f"{m.type}: {message_text(m)}" for m in old_messages),
+    )
+    llm = llm_pool.get(LLM_MODEL, api_key).llm
+    response = await llm.ainvoke(prompt, config=config)
+    record_llm_usage("summary", response)
+    return {"summary" : message_text(response), "messages" : [RemoveMessage(id=m.id) for m in old_messages]}
+
+async def summarize_node(state : AgentState, config):
+    trigger = SUMMARY_TRIGGER_TOKENS if SUMMARY_MODE == "inline" else SUMMARY_HARD_LIMIT_TOKENS
+    return await fold_summary(state, config["metadata"]["api_key"], trigger, config)
+
+summarizing_sessions = set()
+
+async def summarize_session(config : dict):
+    """
+    Background summarization for a finished turn. If a new turn races it,
+    that turn's checkpoint wins and the fold simply happens after it.
+    """
+    thread_id = config["configurable"].get("thread_id")
+    if SUMMARY_MODE != "background" or not thread_id or thread_id in summarizing_sessions:
+        return
+    summarizing_sessions.add(thread_id)
+    try:
+        snapshot = await graph.aget_state(config)
+        update = await fold_summary(snapshot.values, config["configurable"]["api_key"], SUMMARY_TRIGGER_TOKENS)
+        if update:
+            await graph.aupdate_state(config, update, as_node="llm_node")
+    except Exception as e:
+        print(f"Background summarization failed for {thread_id}: {e}")
+    finally:
+        summarizing_sessions.discard(thread_id)
+
+# CHECKPOINTER=sqlite (default) persists sessions in CHECKPOINTER_URL so every
+# worker on the host shares them; CHECKPOINTER=memory keeps them in-process.
+checkpoint_store = build_checkpoint_store(os.getenv("CHECKPOINTER", "sqlite"), os.getenv("CHECKPOINTER_URL"))
+
+def build_graph(mode : str = "two_stage"):
+    """
+    two_stage   : intent_handler (local rules, LLM fallback) then llm_node.
+    single_call : local rules only; unresolved turns go to fused_node, which
+                  picks the intent and answers in one structured-output call.
+                  The answer is a tool-call argument there, and Gemini does not
+                  stream those incrementally, so /chat/stream gets it in one
+                  piece: fewer LLM calls, but time-to-first-token is the whole
+                  fused call. Compare the modes on TTFT as well as p50/p95.
+    """
+    builder = StateGraph(AgentState, input_schema = AgentInputState)
 
-builder = StateGraph(AgentState, input_schema = AgentInputState)
-memory = MemorySaver()
-tool_node = ToolNode(tools)
+    builder.add_node("summarize_node", summarize_node)
+    builder.add_node("llm_node", llm_node)
+    builder.add_node("tools", tool_node)
 
-builder.add_node("summarize_node", summarize_node)
-builder.add_node("intent_handler", intent_handler)
-builder.add_node("llm_node", llm_node)
-builder.add_node("tools", tool_node)
+    if mode == "single_call":
+        builder.add_node("intent_handler", local_intent_node)
+        builder.add_node("fused_node", fused_node)
+        builder.add_conditional_edges("summarize_node", route_by_intent, ["llm_node", "fused_node"])
+        builder.add_conditional_edges("llm_node", tools_condition)
+        builder.add_conditional_edges("fused_node", tools_condition)
+        builder.add_conditional_edges("tools", route_by_intent, ["llm_node", "fused_node"])
+    elif mode == "two_stage":
+        builder.add_node("intent_handler", intent_handler)
+        builder.add_edge("summarize_node", "llm_node")
+        builder.add_conditional_edges("llm_node", tools_condition)
+        builder.add_edge("tools", "llm_node")
+    else:
+        raise ValueError(f"Unknown GRAPH_MODE {mode!r}, expected 'two_stage' or 'single_call'")
 
-builder.add_edge(START, "intent_handler")
-builder.add_edge("intent_handler","summarize_node")
-builder.add_edge("summarize_node", "llm_node")
-builder.add_conditional_edges("llm_node", tools_condition)
-builder.add_edge("tools", "llm_node")
+    builder.add_edge(START, "intent_handler")
+    if PREFETCH_ENABLED:
+        # Retrieval starts at START next to classification; summarize_node waits for both.
+        builder.add_node("prefetch_node", prefetch_node)
+        builder.add_edge(START, "prefetch_node")
+        builder.add_edge(["intent_handler", "prefetch_node"], "summarize_node")
+    else:
+        builder.add_edge("intent_handler", "summarize_node")
 
-graph = builder.compile(checkpointer=memory)
+    return builder.compile(checkpointer=checkpoint_store.saver)
 
+graph = build_graph(os.getenv("GRAPH_MODE", "two_stage"))
+# Pregel merges graph.config into every run, so all turns are instrumented.
+# TRACE_LOG=stdout or a file path adds one JSON trace line per turn.
+instrumentation = GraphInstrumentation(trace_log=os.getenv("TRACE_LOG") or None)
+graph.config = {**(graph.config or {}), "callbacks" : [instrumentation]}
 
+async def open_checkpointer():
+    """Opens the checkpoint store on the server loop and attaches it to the graph."""
+    await checkpoint_store.open()
+    graph.checkpointer = checkpoint_store.saver
@@ -0,0 +1,147 @@
+"""Semantic answer cache placed in front of the agent graph
+
+Entries are partitioned by intent and matched on cosine similarity of the query
+embedding, with TTL and LRU eviction. The in-memory backend keeps everything in
+process, so the cache can be exercised offline with any embeddings object.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Follow-ups that only make sense with the earlier conversation.
+HISTORY_MARKERS = re.compile(
+    r"\b(it|its|it's|that|this|those|these|they|them|their|he|she|above|earlier|previous|"
+    r"before|again|same|also|more|else|instead|another|other one|the first|the second|the last)\b",
+    re.IGNORECASE,
+)
+
+# Entities are extracted from the query text itself, so a merely similar query
+# is not the same request.
+EXACT_MATCH_INTENTS = {"extract_entities"}
+
+
+def normalize_query(query : str) -> str:
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+
+def depends_on_history(query : str, has_history : bool) -> bool:
+    return has_history and bool(HISTORY_MARKERS.search(query))
+
+
+@dataclass
+class CacheEntry:
+    intent : str
+    query : str
+    vector : np.ndarray
+    response : str
+    created_at : float = field(default_factory=time.monotonic)
+
+
+class InMemoryAnswerCacheBackend:
+    """Size-bounded LRU store; lookups are a vectorized scan over one intent."""
+
+    def __init__(self, max_entries : int = 1000):
+        self.max_entries = max_entries
+        self._entries : OrderedDict[int, CacheEntry] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def search(self, intent : str, vector : np.ndarray) -> tuple[int | None, CacheEntry | None, float]:
+        with self._lock:
+            candidates = [(entry_id, entry) for entry_id, entry in self._entries.items() if entry.intent == intent]
+        if not candidates:
+            return None, None, 0.0
+
+        matrix = np.stack([entry.vector for _, entry in candidates])
+        scores = matrix @ vector
+        best = int(scores.argmax())
+        entry_id, entry = candidates[best]
+        return entry_id, entry, float(scores[best])
+
+    def touch(self, entry_id : int):
+        with self._lock:
+            if entry_id in self._entries:
+                self._entries.move_to_end(entry_id)
+
+    def remove(self, entry_id : int):
+        with self._lock:
+            self._entries.pop(entry_id, None)
+
+    def add(self, entry : CacheEntry):
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SemanticAnswerCache:
+    def __init__(self, embeddings, threshold : float = 0.95, ttl : float = 3600, backend = None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        # Not `backend or ...`: an empty backend has len() 0 and is falsy.
+        self.backend = backend if backend is not None else InMemoryAnswerCacheBackend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.expirations = 0
+
+    async def embed(self, query : str) -> np.ndarray:
+        vector = np.asarray(await self.embeddings.aembed_query(normalize_query(query)), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def _count(self, counter : str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def bypass(self):
+        self._count("bypasses")
+
+    async def lookup(self, query : str, intent : str) -> tuple[str | None, np.ndarray]:
+        """Returns (cached response or None, query vector for a later store)."""
+        vector = await self.embed(query)
+        entry_id, entry, score = self.backend.search(intent, vector)
+
+        if entry is not None and time.monotonic() - entry.created_at > self.ttl:
+            self.backend.remove(entry_id)
+            self._count("expirations")
+            entry = None
+
+        if entry is None or score < self.threshold or (
+            entry.intent in EXACT_MATCH_INTENTS and normalize_query(entry.query) != normalize_query(query)
+        ):
+            self._count("misses")
+            return None, vector
+
+        self.backend.touch(entry_id)
+        self._count("hits")
+        return entry.response, vector
+
+    def store(self, query : str, intent : str, vector : np.ndarray, response : str):
+        if not response:
+            return
+        self.backend.add(CacheEntry(intent=intent, query=query, vector=vector, response=response))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size" : len(self.backend),
+                "hits" : self.hits,
+                "misses" : self.misses,
+                "bypasses" : self.bypasses,
+                "expirations" : self.expirations,
+                "evictions" : getattr(self.backend, "evictions", 0),
+                "hit_rate" : self.hits / lookups if lookups else 0.0,
+            }
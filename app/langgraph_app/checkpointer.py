@@ -0,0 +1,195 @@
+"""Conversation checkpoint stores with TTL session eviction and version pruning
+
+A store wraps a LangGraph checkpointer (`store.saver`, available after
+`await store.open()`) and adds the housekeeping MemorySaver never did:
+
+* `touch(thread_id)` records session activity on every request
+* `evict_expired(ttl)` deletes every checkpoint of idle sessions
+* `prune(keep)` keeps only the newest `keep` checkpoints per thread; `keep <= 0`
+  disables pruning, since it would delete live sessions
+
+`SqliteCheckpointStore` keeps everything in one WAL-mode SQLite file, so
+several uvicorn workers on a host serve the same `session_id`. Other stores
+(e.g. Postgres) plug in by implementing the same methods and registering a
+factory in `CHECKPOINT_STORES`.
+"""
+import asyncio
+import os
+import time
+
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class MemoryCheckpointStore:
+    """Process-local store; sessions are not shared between workers."""
+
+    def __init__(self):
+        self.saver = MemorySaver()
+        self._last_seen : dict[str, float] = {}
+
+    async def open(self):
+        return
+
+    async def close(self):
+        return
+
+    async def touch(self, thread_id : str):
+        self._last_seen[thread_id] = time.time()
+
+    async def evict_expired(self, ttl : float) -> int:
+        cutoff = time.time() - ttl
+        expired = [thread_id for thread_id, seen in self._last_seen.items() if seen < cutoff]
+        for thread_id in expired:
+            await self.saver.adelete_thread(thread_id)
+            self._last_seen.pop(thread_id, None)
+        return len(expired)
+
+    async def prune(self, keep : int) -> int:
+        if keep <= 0:
+            return 0
+        pruned = 0
+        referenced : dict[tuple, set] = {}
+        for thread_id, namespaces in list(self.saver.storage.items()):
+            for checkpoint_ns, checkpoints in list(namespaces.items()):
+                # Checkpoint ids are time-ordered UUIDs, newest sorts last.
+                checkpoint_ids = sorted(checkpoints)
+                stale = checkpoint_ids[:-keep]
+                if not stale:
+                    continue
+                for checkpoint_id in stale:
+                    del checkpoints[checkpoint_id]
+                    self.saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                    pruned += 1
+                referenced[(thread_id, checkpoint_ns)] = {
+                    (channel, version)
+                    for saved in checkpoints.values()
+                    for channel, version in self.saver.serde.loads_typed(saved[0])["channel_versions"].items()
+                }
+        # Channel values (the message lists) live in blobs, keyed by
+        # (thread, ns, channel, version); drop those no kept checkpoint uses.
+        for key in [k for k in self.saver.blobs if k[:2] in referenced and k[2:] not in referenced[k[:2]]]:
+            del self.saver.blobs[key]
+        return pruned
+
+    async def stats(self) -> dict:
+        checkpoints = sum(len(c) for ns in self.saver.storage.values() for c in ns.values())
+        return {"backend" : "memory", "sessions" : len(self.saver.storage), "checkpoints" : checkpoints}
+
+
+class SqliteCheckpointStore:
+    def __init__(self, path : str):
+        self.path = path
+        # AsyncSqliteSaver binds to the running loop, so it is created in open().
+        self.saver = None
+
+    async def open(self):
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        self.saver = AsyncSqliteSaver(await aiosqlite.connect(self.path))
+        await self.saver.setup()
+        async with self.saver.lock:
+            # WAL lets several worker processes read while one writes.
+            await self.saver.conn.execute("PRAGMA journal_mode=WAL")
+            await self.saver.conn.execute("PRAGMA busy_timeout=5000")
+            await self.saver.conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_activity (thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+            )
+            await self.saver.conn.commit()
+
+    async def close(self):
+        if self.saver is not None:
+            await self.saver.conn.close()
+
+    async def touch(self, thread_id : str):
+        async with self.saver.lock:
+            await self.saver.conn.execute(
+                "INSERT INTO session_activity (thread_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (thread_id, time.time()),
+            )
+            await self.saver.conn.commit()
+
+    async def evict_expired(self, ttl : float) -> int:
+        async with self.saver.lock:
+            async with self.saver.conn.execute(
+                "SELECT thread_id FROM session_activity WHERE last_seen < ?", (time.time() - ttl,)
+            ) as cursor:
+                expired = [row[0] for row in await cursor.fetchall()]
+
+        for thread_id in expired:
+            await self.saver.adelete_thread(thread_id)
+        if expired:
+            async with self.saver.lock:
+                await self.saver.conn.executemany(
+                    "DELETE FROM session_activity WHERE thread_id = ?", [(thread_id,) for thread_id in expired]
+                )
+                await self.saver.conn.commit()
+        return len(expired)
+
+    async def prune(self, keep : int) -> int:
+        if keep <= 0:
+            return 0
+        async with self.saver.lock:
+            cursor = await self.saver.conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS version
+                        FROM checkpoints
+                    ) WHERE version > ?
+                )
+                """,
+                (keep,),
+            )
+            pruned = cursor.rowcount
+            await self.saver.conn.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c
+                    WHERE c.thread_id = writes.thread_id
+                      AND c.checkpoint_ns = writes.checkpoint_ns
+                      AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            )
+            await self.saver.conn.commit()
+        return pruned
+
+    async def stats(self) -> dict:
+        async with self.saver.lock:
+            async with self.saver.conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ) as cursor:
+                sessions, checkpoints = await cursor.fetchone()
+        return {"backend" : "sqlite", "sessions" : sessions, "checkpoints" : checkpoints}
+
+
+# Anchored to the repository root so the file does not depend on the working directory.
+DEFAULT_SQLITE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "checkpoints.sqlite"))
+
+CHECKPOINT_STORES = {
+    "memory" : lambda url : MemoryCheckpointStore(),
+    "sqlite" : lambda url : SqliteCheckpointStore(url or DEFAULT_SQLITE_PATH),
+}
+
+
+def build_checkpoint_store(backend : str, url : str | None = None):
+    if backend not in CHECKPOINT_STORES:
+        raise ValueError(f"Unknown CHECKPOINTER {backend!r}, expected one of {sorted(CHECKPOINT_STORES)}")
+    return CHECKPOINT_STORES[backend](url)
+
+
+async def run_maintenance(store, ttl : float, keep : int, interval : float):
+    """Background loop started with the API; never raises into the server."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await store.evict_expired(ttl)
+            pruned = await store.prune(keep)
+            if evicted or pruned:
+                print(f"Checkpoint maintenance: evicted {evicted} sessions, pruned {pruned} checkpoints")
+        except Exception as e:
+            print(f"Checkpoint maintenance failed: {e}")
@@ -0,0 +1,133 @@
+"""Memoizing wrapper around an embeddings model
+
+Query text is normalized with the answer cache's `normalize_query`, so the
+answer cache, retrieval and prefetch all share one key per question. Vectors
+are kept in an in-process LRU and optionally persisted to a SQLite file so
+repeated or re-issued retrievals never pay for the embedding network call twice.
+"""
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from hashlib import sha256
+
+from langchain_core.embeddings import Embeddings
+
+from langgraph_app.answer_cache import normalize_query
+
+
+class DiskEmbeddingStore:
+    """SQLite table of (key, float32 blob); safe to share between threads."""
+
+    def __init__(self, path : str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, key : str) -> list[float] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector = array("f")
+        vector.frombytes(row[0])
+        return vector.tolist()
+
+    def put(self, key : str, vector : list[float]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                (key, array("f", vector).tobytes()),
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings : Embeddings, model_name : str, max_size : int = 4096, disk_path : str | None = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_size = max_size
+        self.disk = DiskEmbeddingStore(disk_path) if disk_path else None
+        self._memory : OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text : str) -> str:
+        return sha256(f"{self.model_name}\x00{text}".encode()).hexdigest()
+
+    def _get(self, key : str) -> list[float] | None:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                with self._lock:
+                    self.disk_hits += 1
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key : str, vector : list[float]):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def _put(self, key : str, vector : list[float]):
+        self._remember(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+
+    def embed_query(self, text : str) -> list[float]:
+        text = normalize_query(text)
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._put(key, vector)
+        return vector
+
+    async def aembed_query(self, text : str) -> list[float]:
+        text = normalize_query(text)
+        key = self._key(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._put(key, vector)
+        return vector
+
+    def embed_documents(self, texts : list[str]) -> list[list[float]]:
+        # Documents are embedded verbatim; only exact repeats are served from cache.
+        keys = [self._key(text) for text in texts]
+        vectors = [self._get(key) for key in keys]
+        missing = {keys[i] : texts[i] for i, vector in enumerate(vectors) if vector is None}
+        if missing:
+            fresh = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            for key, vector in fresh.items():
+                self._put(key, vector)
+            vectors = [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size" : len(self._memory),
+                "max_size" : self.max_size,
+                "hits" : self.hits,
+                "disk_hits" : self.disk_hits,
+                "misses" : self.misses,
+                "hit_rate" : (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,261 @@
+"""Local fast-path intent classification for the US Policy Navigator Agent
+
+Mirrors the keyword triggers in `Intent_Handler_Prompt` so obvious queries are
+labelled without a Gemini round trip. `intent_handler` only falls back to the
+LLM when the local confidence is below the threshold.
+"""
+import asyncio
+import importlib.util
+import re
+import threading
+
+from langgraph_app.lazy import LazyResource
+
+INTENTS = ("policy_comparison", "extract_entities", "eli5", "general_qa")
+
+# (pattern, confidence). Ordered by the prompt's specificity hierarchy:
+# policy_comparison > extract_entities > eli5 > general_qa
+INTENT_RULES = {
+    "policy_comparison" : [
+        (r"\bcompar(e|es|ed|ing|ison)\b", 0.95),
+        (r"\bcontrast(s|ed|ing)?\b", 0.95),
+        (r"\bdifferen(ce|ces|t) (between|from)\b", 0.95),
+        (r"\bsimilarit(y|ies)\b", 0.95),
+        (r"\b(is|are) .+ similar to\b", 0.9),
+        (r"\b(vs\.?|versus)\b", 0.9),
+        (r"\bdiffer(s)?\b", 0.75),
+    ],
+    "extract_entities" : [
+        (r"^\s*(please\s+)?(list|identify|extract|enumerate|name)\b", 0.9),
+        (r"\b(list|identify|extract) (all|every|the)\b", 0.9),
+        (r"\bwho is (mentioned|named|referenced)\b", 0.9),
+        (r"\bwhich (agencies|entities|statutes|regulations) are (mentioned|named|referenced)\b", 0.9),
+    ],
+    "eli5" : [
+        (r"\beli5\b", 0.98),
+        (r"\blike (i'?m|i am|im) (5|five|a kid|a child|dumb|stupid)\b", 0.95),
+        (r"\b(in |using )?(simple|plain|easy|layman'?s?)( |-)(terms|words|language|english)\b", 0.9),
+        (r"\beasy[- ]to[- ]understand\b", 0.9),
+        (r"\bwhat does .+ mean for (me|us|my)\b", 0.85),
+        (r"\bexplain\b", 0.7),
+    ],
+    "general_qa" : [
+        (r"^\s*(what|how|when|which|who|where|why|is|are|does|do|can|could|should|will|was|were)\b", 0.85),
+    ],
+}
+
+# Words that hint at a specific label without being decisive. The general_qa
+# rule is a catch-all for questions, so it is only trusted when none of these
+# appear; otherwise the query goes to the LLM.
+INTENT_HINTS = {
+    "policy_comparison" : r"\b(differen(ce|ces|t|tly)|differ(s|ing)?|similar(ly|ities)?|distinguish(es)?|between|both|relative to|each other)\b",
+    "extract_entities" : r"\b(mentioned|named|referenced|cited|listed|entities|agencies|organi[sz]ations|statutes|parties)\b",
+    "eli5" : r"\b(mean(s|ing)?|simpl(e|y|er)|break (it )?down|basics)\b",
+}
+AMBIGUOUS_GENERAL_CONFIDENCE = 0.5
+
+# A second, different specific label matching lowers confidence so that
+# genuinely mixed queries go to the LLM.
+CONFLICT_PENALTY = 0.15
+
+COMPILED_RULES = {
+    intent : [(re.compile(pattern, re.IGNORECASE), confidence) for pattern, confidence in rules]
+    for intent, rules in INTENT_RULES.items()
+}
+COMPILED_HINTS = {intent : re.compile(pattern, re.IGNORECASE) for intent, pattern in INTENT_HINTS.items()}
+
+# Seed examples for the optional nearest-centroid model.
+INTENT_EXAMPLES = {
+    "eli5" : [
+        "Can you explain the Clean Air Act in simple, easy-to-understand language?",
+        "what does 'habeas corpus' mean lol can u explain it like im dumb",
+        "Explain HIPAA like I'm five",
+        "What does the Affordable Care Act mean for me?",
+    ],
+    "extract_entities" : [
+        "Please list all the federal agencies mentioned in the text of the Patriot Act.",
+        "Identify the statutes referenced in this paragraph",
+        "Extract the regulations cited in Title 21 CFR Part 11",
+        "Who is mentioned in Executive Order 13959?",
+    ],
+    "policy_comparison" : [
+        "How is the California Consumer Privacy Act (CCPA) different from Europe's GDPR?",
+        "Tell me the similarities between FMLA and ADA.",
+        "Compare the Clean Air Act and the Clean Water Act",
+        "What's the difference between Medicare and Medicaid?",
+    ],
+    "general_qa" : [
+        "What are the current federal regulations for drone operation?",
+        "What is the penalty for violating the Clean Air Act?",
+        "When was the Americans with Disabilities Act enacted?",
+        "Which states have data breach notification laws?",
+    ],
+}
+
+
+def normalize_intent(label : str) -> str:
+    """Clean an LLM label (backticks, whitespace, case); unknown labels map to general_qa."""
+    label = label.strip().strip("`'\".").strip().lower()
+    return label if label in INTENTS else "general_qa"
+
+
+def classify_by_rules(query : str) -> tuple[str | None, float]:
+    scores = {}
+    for intent, rules in COMPILED_RULES.items():
+        best = max((confidence for pattern, confidence in rules if pattern.search(query)), default=0.0)
+        if best:
+            scores[intent] = best
+
+    if not scores:
+        return None, 0.0
+
+    # Pick the most specific label, not the highest score.
+    intent = next(i for i in INTENTS if i in scores)
+    confidence = scores[intent]
+    others = [i for i in scores if i != intent and i != "general_qa"]
+    if others:
+        confidence -= CONFLICT_PENALTY
+    if intent == "general_qa" and any(hint.search(query) for hint in COMPILED_HINTS.values()):
+        confidence = min(confidence, AMBIGUOUS_GENERAL_CONFIDENCE)
+    return intent, confidence
+
+
+class CentroidIntentClassifier:
+    """
+    Nearest-centroid classifier over a (preferably local) embedding model.
+    Confidence is the softmax probability of the closest centroid. Embedding
+    is blocking, so async callers go through IntentClassifier.aclassify.
+    """
+
+    def __init__(self, embeddings, examples : dict[str, list[str]] = INTENT_EXAMPLES, temperature : float = 0.05):
+        self.embeddings = embeddings
+        self.examples = examples
+        self.temperature = temperature
+        self._labels = None
+        self._centroids = None
+        self._lock = threading.Lock()
+
+    def _fit(self):
+        import numpy as np
+
+        labels, centroids = [], []
+        for intent, texts in self.examples.items():
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            centroid = vectors.mean(axis=0)
+            centroids.append(centroid / np.linalg.norm(centroid))
+            labels.append(intent)
+        self._labels = labels
+        self._centroids = np.stack(centroids)
+
+    def classify(self, query : str) -> tuple[str, float]:
+        import numpy as np
+
+        with self._lock:
+            if self._centroids is None:
+                self._fit()
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+        similarities = self._centroids @ vector
+        weights = np.exp((similarities - similarities.max()) / self.temperature)
+        probabilities = weights / weights.sum()
+        best = int(probabilities.argmax())
+        return self._labels[best], float(probabilities[best])
+
+
+class IntentClassifier:
+    """Rules first, then the optional centroid model; None means "ask the LLM"."""
+
+    def __init__(self, threshold : float = 0.8, centroid : CentroidIntentClassifier | None = None):
+        self.threshold = threshold
+        self.centroid = centroid
+        self.rule_hits = 0
+        self.centroid_hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter : str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _by_rules(self, query : str) -> tuple[str | None, float]:
+        intent, confidence = classify_by_rules(query)
+        if intent is not None and confidence >= self.threshold:
+            self._count("rule_hits")
+            return intent, confidence
+        return None, confidence
+
+    def _by_centroid(self, centroid_result : tuple[str, float], confidence : float) -> tuple[str | None, float, str]:
+        centroid_intent, centroid_confidence = centroid_result
+        if centroid_confidence >= self.threshold:
+            self._count("centroid_hits")
+            return centroid_intent, centroid_confidence, "centroid"
+        self._count("fallbacks")
+        return None, confidence, "none"
+
+    def _centroid_failed(self, error : Exception, confidence : float) -> tuple[None, float, str]:
+        # e.g. the model could not be downloaded; the LLM classifies instead.
+        print(f"Centroid intent classification failed: {error!r}")
+        self._count("fallbacks")
+        return None, confidence, "none"
+
+    def classify(self, query : str) -> tuple[str | None, float, str]:
+        """Returns (intent, confidence, source) where source is rules/centroid/none."""
+        intent, confidence = self._by_rules(query)
+        if intent is not None:
+            return intent, confidence, "rules"
+        if self.centroid is None:
+            self._count("fallbacks")
+            return None, confidence, "none"
+        try:
+            centroid_result = self.centroid.classify(query)
+        except Exception as e:
+            return self._centroid_failed(e, confidence)
+        return self._by_centroid(centroid_result, confidence)
+
+    async def aclassify(self, query : str) -> tuple[str | None, float, str]:
+        """Like classify, but the centroid embedding runs off the event loop."""
+        intent, confidence = self._by_rules(query)
+        if intent is not None:
+            return intent, confidence, "rules"
+        if self.centroid is None:
+            self._count("fallbacks")
+            return None, confidence, "none"
+        loop = asyncio.get_running_loop()
+        try:
+            centroid_result = await loop.run_in_executor(None, self.centroid.classify, query)
+        except Exception as e:
+            return self._centroid_failed(e, confidence)
+        return self._by_centroid(centroid_result, confidence)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.rule_hits + self.centroid_hits + self.fallbacks
+            return {
+                "rule_hits" : self.rule_hits,
+                "centroid_hits" : self.centroid_hits,
+                "llm_fallbacks" : self.fallbacks,
+                "local_hit_rate" : (self.rule_hits + self.centroid_hits) / total if total else 0.0,
+            }
+
+
+def build_intent_classifier(threshold : float = 0.8, centroid_model : str | None = None) -> IntentClassifier:
+    """
+    `centroid_model` names a local FastEmbed model (e.g. "BAAI/bge-small-en-v1.5").
+    The centroid stage is skipped when it is unset or fastembed is not installed.
+    The model is downloaded and loaded on first use or by the startup warm-up.
+    """
+    centroid = None
+    if centroid_model:
+        if importlib.util.find_spec("fastembed") is None:
+            print("fastembed is not installed, local intent classification uses rules only")
+        else:
+            def build_centroid_embeddings():
+                from langchain_community.embeddings import FastEmbedEmbeddings
+                return FastEmbedEmbeddings(model_name=centroid_model)
+
+            # Optional for readiness: without it, low-confidence turns go to the LLM.
+            embeddings = LazyResource("intent_centroid", build_centroid_embeddings, required=False)
+            centroid = CentroidIntentClassifier(embeddings)
+    return IntentClassifier(threshold=threshold, centroid=centroid)
@@ -0,0 +1,89 @@
+"""Lazily built, thread-safe process resources with an explicit warm-up
+
+Network clients (Cosmos vector store, Tavily, Gemini embeddings) used to be
+built at import time, so importing the API was slow and failed hard when a
+backend was briefly unreachable. A `LazyResource` builds its client on first
+use (or in `warm_up` at startup) under a lock, so concurrent first requests
+build it once, and a failed build is retried on the next use. Attribute access
+is forwarded to the built client, so it can stand in for it directly.
+"""
+import asyncio
+import threading
+import time
+
+RESOURCES : dict[str, "LazyResource"] = {}
+
+
+class LazyResource:
+    def __init__(self, name : str, factory, required : bool = True):
+        self.name = name
+        self.factory = factory
+        self.required = required
+        self._value = None
+        self._built = False
+        self._lock = threading.Lock()
+        self.init_seconds : float | None = None
+        self.last_error : str | None = None
+        RESOURCES[name] = self
+
+    def get(self):
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    raise
+                self.init_seconds = time.perf_counter() - start
+                self.last_error = None
+                self._built = True
+        return self._value
+
+    @property
+    def ready(self) -> bool:
+        return self._built
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._built = False
+
+    def __getattr__(self, attribute : str):
+        # Only reached for attributes LazyResource itself does not define.
+        if attribute.startswith("_"):
+            raise AttributeError(attribute)
+        return getattr(self.get(), attribute)
+
+    def status(self) -> dict:
+        return {
+            "ready" : self._built,
+            "required" : self.required,
+            "init_seconds" : round(self.init_seconds, 3) if self.init_seconds is not None else None,
+            "error" : self.last_error,
+        }
+
+
+async def warm_up(retries : int = 5, backoff : float = 1.0):
+    """Builds every registered resource off the event loop, retrying with backoff."""
+    loop = asyncio.get_running_loop()
+
+    async def build(resource : LazyResource):
+        for attempt in range(retries):
+            try:
+                await loop.run_in_executor(None, resource.get)
+                print(f"Warm-up: {resource.name} ready in {resource.init_seconds:.2f}s")
+                return
+            except Exception as e:
+                print(f"Warm-up: {resource.name} failed (attempt {attempt + 1}/{retries}): {e}")
+                await asyncio.sleep(backoff * 2 ** attempt)
+
+    await asyncio.gather(*(build(resource) for resource in RESOURCES.values()))
+
+
+def readiness() -> tuple[bool, dict]:
+    statuses = {name : resource.status() for name, resource in RESOURCES.items()}
+    ready = all(status["ready"] for status in statuses.values() if status["required"])
+    return ready, statuses
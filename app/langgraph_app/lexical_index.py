@@ -0,0 +1,78 @@
+"""BM25 full-text index and reciprocal rank fusion for hybrid retrieval"""
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Keeps section numbers and citations such as "1201.2", "42-u" or "13959" intact.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this "
+    "to was what when where which who why will with".split()
+)
+
+
+def tokenize(text : str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index of row ids."""
+
+    def __init__(self, texts, k1 : float = 1.5, b : float = 0.75):
+        self.k1 = k1
+        self.b = b
+        postings = defaultdict(list)
+        lengths = []
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((row, tf))
+
+        self.count = len(lengths)
+        self.lengths = np.asarray(lengths, dtype=np.float32)
+        # 1.0 for an empty (or stopword-only) corpus, so scoring never divides by zero.
+        self.average_length = float(self.lengths.mean()) if self.lengths.sum() else 1.0
+        self.postings = {
+            term : (np.asarray([r for r, _ in rows], dtype=np.int64), np.asarray([tf for _, tf in rows], dtype=np.float32))
+            for term, rows in postings.items()
+        }
+
+    def search(self, query : str, k : int = 5) -> list[tuple[int, float]]:
+        """Returns (row, score) pairs, best first."""
+        if self.count == 0:
+            return []
+        scores = np.zeros(self.count, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, tfs = self.postings[term]
+            idf = math.log(1 + (self.count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / self.average_length)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched])]
+        return [(int(row), float(scores[row])) for row in matched]
+
+
+def document_key(doc) -> str:
+    return doc.id or doc.metadata.get("id") or doc.page_content
+
+
+def reciprocal_rank_fusion(result_lists : list[list], k : int = 5, rrf_k : int = 60) -> list:
+    """Fuses ranked Document lists; a document's score is sum(1 / (rrf_k + rank))."""
+    scores = defaultdict(float)
+    documents = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = document_key(doc)
+            scores[key] += 1.0 / (rrf_k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:k]]
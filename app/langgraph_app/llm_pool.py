@@ -0,0 +1,74 @@
+"""Bounded LRU pool of ready-to-use Gemini clients keyed by (model, api_key)"""
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+
+class PooledLLM(NamedTuple):
+    llm : ChatGoogleGenerativeAI
+    llm_with_tools : object
+    llm_with_answer : object | None
+
+
+class LLMPool:
+    """
+    Keeps up to `max_size` clients alive so HTTP connections and the bound tool
+    schemas are reused across turns instead of being rebuilt in every node.
+    """
+
+    def __init__(self, tools : list, max_size : int = 32, temperature : float = 0, answer_schema = None):
+        self.tools = tools
+        self.answer_schema = answer_schema
+        self.max_size = max_size
+        self.temperature = temperature
+        self._clients : OrderedDict[tuple[str, str], PooledLLM] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model : str, api_key : str) -> PooledLLM:
+        key = (model, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                self.hits += 1
+                return client
+            self.misses += 1
+
+        llm = ChatGoogleGenerativeAI(model=model, temperature=self.temperature, google_api_key=api_key)
+        llm_with_answer = None
+        if self.answer_schema is not None:
+            # The answer schema is exposed as one more tool and a tool call is
+            # forced, so every response is either a retrieval or the final answer.
+            llm_with_answer = llm.bind_tools(self.tools + [self.answer_schema], tool_choice="any")
+        client = PooledLLM(llm=llm, llm_with_tools=llm.bind_tools(self.tools), llm_with_answer=llm_with_answer)
+
+        with self._lock:
+            # Another coroutine/thread may have built the same client meanwhile.
+            existing = self._clients.get(key)
+            if existing is not None:
+                self._clients.move_to_end(key)
+                return existing
+            self._clients[key] = client
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        return client
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size" : len(self._clients),
+                "max_size" : self.max_size,
+                "hits" : self.hits,
+                "misses" : self.misses,
+                "evictions" : self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
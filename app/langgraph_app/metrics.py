@@ -0,0 +1,220 @@
+"""Prometheus text-format metrics and per-turn trace logs for the agent graph
+
+`GraphInstrumentation` is a LangChain callback handler attached to the
+compiled graph. It times every graph node, every tool call and the whole turn,
+counts tool-loop iterations per turn and, when TRACE_LOG is set ("stdout" or a
+file path), writes one JSON line per turn keyed by session_id with every span.
+Token counts are recorded by the nodes themselves, since only they know the
+intent. `/metrics` renders these together with the cache and pool stats.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_BUCKETS = (0, 1, 2, 3, 4, 6, 8)
+
+
+def format_labels(labels : dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name : str, help : str):
+        self.name = name
+        self.help = help
+        self._values : dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount : float = 1.0, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(dict(labels))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name : str, help : str, buckets : tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # labels -> (per-bucket counts, sum, count)
+        self._values : dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value : float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                labels = dict(labels)
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{format_labels({**labels, 'le' : bound})} {bucket_count}")
+                lines.append(f"{self.name}_bucket{format_labels({**labels, 'le' : '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+
+node_duration = Histogram("agent_node_duration_seconds", "Wall time per graph node run")
+tool_duration = Histogram("agent_tool_duration_seconds", "Wall time per tool call")
+turn_duration = Histogram("agent_turn_duration_seconds", "Wall time per graph run (one user turn)")
+tool_loops = Histogram("agent_tool_loop_iterations", "Tool stage executions per turn", LOOP_BUCKETS)
+turns_total = Counter("agent_turns_total", "Graph runs by outcome")
+llm_tokens = Counter("agent_llm_tokens_total", "LLM tokens by intent and direction")
+
+METRICS = [node_duration, tool_duration, turn_duration, tool_loops, turns_total, llm_tokens]
+
+
+def record_llm_usage(intent : str | None, response):
+    """Counts prompt and completion tokens of an LLM response under `intent`."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    intent = intent or "unknown"
+    llm_tokens.inc(usage.get("input_tokens", 0), intent=intent, type="prompt")
+    llm_tokens.inc(usage.get("output_tokens", 0), intent=intent, type="completion")
+
+
+def stats_samples(prefix : str, stats : dict, **labels) -> list[tuple[str, dict, float]]:
+    """Numeric entries of a component's stats() dict as gauge samples."""
+    return [
+        (f"{prefix}_{key}", labels, float(value))
+        for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+
+def render_metrics(samples : list[tuple[str, dict, float]]) -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    by_name = defaultdict(list)
+    for name, labels, value in samples:
+        by_name[name].append((labels, value))
+    for name, values in by_name.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in values)
+    return "\n".join(lines) + "\n"
+
+
+class GraphInstrumentation(BaseCallbackHandler):
+    run_inline = True
+
+    def __init__(self, trace_log : str | None = None):
+        self.trace_log = trace_log
+        self._turns : dict = {}
+        self._spans : dict = {}
+        self._lock = threading.Lock()
+
+    def _open_span(self, run_id, parent_run_id, kind : str, name : str):
+        turn_id = parent_run_id if parent_run_id in self._turns else self._spans.get(parent_run_id, {}).get("turn_id")
+        self._spans[run_id] = {"kind" : kind, "name" : name, "start" : time.perf_counter(), "turn_id" : turn_id}
+        if kind == "node" and name == "tools" and turn_id in self._turns:
+            self._turns[turn_id]["tool_loops"] += 1
+
+    def _close_span(self, run_id, status : str):
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        duration = time.perf_counter() - span["start"]
+        if span["kind"] == "node":
+            node_duration.observe(duration, node=span["name"])
+        else:
+            tool_duration.observe(duration, tool=span["name"], status=status)
+        turn = self._turns.get(span["turn_id"])
+        if turn is not None and self.trace_log:
+            turn["spans"].append({
+                "type" : span["kind"],
+                "name" : span["name"],
+                "start_ms" : round((span["start"] - turn["start"]) * 1000, 1),
+                "duration_ms" : round(duration * 1000, 1),
+                "status" : status,
+            })
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id = None, metadata = None, **kwargs):
+        metadata = metadata or {}
+        with self._lock:
+            if parent_run_id is None:
+                # aupdate_state runs its writers as a root "<graph>UpdateState"
+                # run (cache hits, summaries); those are not turns.
+                if (kwargs.get("name") or "").endswith("UpdateState"):
+                    return
+                self._turns[run_id] = {
+                    "session_id" : metadata.get("thread_id"),
+                    "start" : time.perf_counter(),
+                    "tool_loops" : 0,
+                    "spans" : [],
+                }
+            elif metadata.get("langgraph_node") and kwargs.get("name") == metadata["langgraph_node"]:
+                self._open_span(run_id, parent_run_id, "node", metadata["langgraph_node"])
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id, "ok")
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id = None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        with self._lock:
+            self._open_span(run_id, parent_run_id, "tool", name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        status = getattr(output, "status", "success")
+        with self._lock:
+            self._close_span(run_id, "ok" if status == "success" else status)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._close_span(run_id, "error")
+
+    def _finish(self, run_id, status : str):
+        with self._lock:
+            self._close_span(run_id, status)
+            if run_id not in self._turns:
+                return
+            # Tools cancelled by their timeout never report an end.
+            for span_id in [i for i, span in self._spans.items() if span["turn_id"] == run_id]:
+                self._close_span(span_id, "cancelled")
+            turn = self._turns.pop(run_id)
+        duration = time.perf_counter() - turn["start"]
+        turn_duration.observe(duration)
+        tool_loops.observe(turn["tool_loops"])
+        turns_total.inc(status=status)
+        if self.trace_log:
+            self._write_trace({
+                "ts" : time.time(),
+                "session_id" : turn["session_id"],
+                "run_id" : str(run_id),
+                "status" : status,
+                "duration_ms" : round(duration * 1000, 1),
+                "tool_loops" : turn["tool_loops"],
+                "spans" : turn["spans"],
+            })
+
+    def _write_trace(self, record : dict):
+        line = json.dumps(record, default=str)
+        if self.trace_log == "stdout":
+            print(line)
+            return
+        with self._lock, open(self.trace_log, "a") as f:
+            f.write(line + "\n")
@@ -0,0 +1,152 @@
+"""Token-budgeted rendering of conversation history for llm_node prompts
+
+Messages are rendered as compact "Role: text" lines instead of the Python
+repr of LangChain message objects (ids, metadata, raw tool payloads). The
+current turn and its tool results are kept first; older turns are added
+newest-first until the intent's budget is spent, with earlier tool results
+elided and the oldest content truncated or dropped.
+"""
+import os
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from langgraph_app.intent_classifier import INTENTS
+from langgraph_app.tokens import CHARS_PER_TOKEN, estimate_tokens, message_text
+
+# History budgets in estimated tokens; extract_entities only needs the query.
+HISTORY_BUDGETS = {
+    "general_qa" : int(os.getenv("HISTORY_BUDGET_GENERAL_QA", "6000")),
+    "eli5" : int(os.getenv("HISTORY_BUDGET_ELI5", "4000")),
+    "policy_comparison" : int(os.getenv("HISTORY_BUDGET_POLICY_COMPARISON", "9000")),
+    "extract_entities" : int(os.getenv("HISTORY_BUDGET_EXTRACT_ENTITIES", "1500")),
+    "fused" : int(os.getenv("HISTORY_BUDGET_FUSED", "9000")),
+}
+DEFAULT_BUDGET = 6000
+
+
+def truncate(text : str, max_tokens : int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 15, 0)].rstrip() + " ...[truncated]"
+
+
+def render_tool_calls(message : AIMessage) -> str:
+    calls = ", ".join(
+        f"{call['name']}({', '.join(f'{k}={v!r}' for k, v in call['args'].items())})" for call in message.tool_calls
+    )
+    return f"Assistant called: {calls}"
+
+
+def render_message(message, max_tokens : int | None = None) -> str:
+    text = message_text(message).strip()
+    if max_tokens is not None:
+        text = truncate(text, max_tokens)
+    if isinstance(message, HumanMessage):
+        return f"User: {text}"
+    if isinstance(message, ToolMessage):
+        return f"Tool result ({message.name or 'tool'}): {text}"
+    if isinstance(message, SystemMessage):
+        return f"System: {text}"
+    if isinstance(message, AIMessage) and message.tool_calls:
+        return render_tool_calls(message) + (f"\nAssistant: {text}" if text else "")
+    return f"Assistant: {text}"
+
+
+def is_intent_label(message) -> bool:
+    # intent_handler's LLM fallback stores its bare label in the history.
+    return isinstance(message, AIMessage) and not message.tool_calls and message_text(message).strip().strip("`") in INTENTS
+
+
+def current_turn_start(messages : list) -> int:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return i
+    return 0
+
+
+def assemble_history(messages : list, summary : str | None, budget : int) -> str:
+    messages = [m for m in messages if not is_intent_label(m)]
+    start = current_turn_start(messages)
+    current, earlier = messages[start:], messages[:start]
+
+    # Current turn: the question stays whole; tool results share what is left.
+    lines = [render_message(m) for m in current if not isinstance(m, ToolMessage)]
+    used = sum(estimate_tokens(line) for line in lines)
+    tool_messages = [m for m in current if isinstance(m, ToolMessage)]
+    if tool_messages:
+        share = max((budget - used) // len(tool_messages), 200)
+        rendered = {id(m) : render_message(m, share) for m in tool_messages}
+        used += sum(estimate_tokens(line) for line in rendered.values())
+        lines = [rendered[id(m)] if isinstance(m, ToolMessage) else render_message(m) for m in current]
+
+    summary_line = f"Summary of conversation earlier: {summary}" if summary else ""
+    used += estimate_tokens(summary_line)
+
+    # Earlier turns, newest first, until the budget runs out.
+    older = []
+    for position, message in enumerate(reversed(earlier)):
+        if isinstance(message, ToolMessage):
+            line = f"Tool result ({message.name or 'tool'}): [elided]"
+        else:
+            line = render_message(message)
+        remaining = budget - used
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if remaining > 100:
+                older.append(render_message(message, remaining - 20))
+                position += 1
+            omitted = len(earlier) - position
+            if omitted:
+                older.append(f"[{omitted} earlier messages omitted]")
+            break
+        older.append(line)
+        used += cost
+
+    parts = ([summary_line] if summary_line else []) + list(reversed(older)) + lines
+    return "\n".join(parts)
+
+
+class PromptStats:
+    """Per-intent prompt sizes: the old repr-based history vs the assembled one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_intent : dict[str, dict[str, int]] = {}
+
+    def record(self, intent : str, raw_tokens : int, assembled_tokens : int, prompt_tokens : int):
+        with self._lock:
+            stats = self.by_intent.setdefault(intent, {"prompts" : 0, "raw_history_tokens" : 0, "history_tokens" : 0, "prompt_tokens" : 0})
+            stats["prompts"] += 1
+            stats["raw_history_tokens"] += raw_tokens
+            stats["history_tokens"] += assembled_tokens
+            stats["prompt_tokens"] += prompt_tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {intent : dict(values) for intent, values in self.by_intent.items()}
+
+
+prompt_stats = PromptStats()
+
+
+def with_prefetched_context(messages : list, context : str) -> list:
+    # Shown as a context_retriever result right after the question, so the
+    # model treats retrieval as already done for this turn.
+    start = current_turn_start(messages)
+    prefetched = ToolMessage(content=context, name="context_retriever", tool_call_id="prefetch")
+    return messages[:start + 1] + [prefetched] + messages[start + 1:]
+
+
+def build_chat_history(state, intent : str) -> str:
+    budget = HISTORY_BUDGETS.get(intent, DEFAULT_BUDGET)
+    messages = state["messages"]
+    if state.get("context") and intent != "extract_entities":
+        messages = with_prefetched_context(messages, state["context"])
+    return assemble_history(messages, state.get("summary"), budget)
+
+
+def record_prompt(state, intent : str, history : str, prompt : str):
+    raw_tokens = estimate_tokens(str(state["messages"]))
+    prompt_stats.record(intent, raw_tokens, estimate_tokens(history), estimate_tokens(prompt))
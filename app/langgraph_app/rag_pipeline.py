@@ -3,21 +3,37 @@ from azure.cosmos import CosmosClient, PartitionKey
 #from langchain_azure_ai.vectorstores.azure_cosmos_db_no_sql import AzureCosmosDBNoSqlVectorSearch
 from langchain_community.vectorstores.azure_cosmos_db_no_sql import (
     AzureCosmosDBNoSqlVectorSearch,
+    CosmosDBQueryType,
 )
+from azure.core.exceptions import AzureError
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from langgraph_app.embedding_cache import CachedEmbeddings
+from langgraph_app.lazy import LazyResource
+from langgraph_app.vector_index import LocalVectorIndex
+from langgraph_app.lexical_index import reciprocal_rank_fusion, tokenize
+from langgraph_app.retrieval_planner import interleave
 
 load_dotenv()
 
 cosmos_host = os.getenv("COSMOS_HOST")
 cosmos_key = os.getenv("COSMOS_KEY")
 
-cosmos_client = CosmosClient(cosmos_host, cosmos_key)
 database_name = "vectordb"
 container_name = "embeddings"
 partition_key = PartitionKey(path="/userId")
 cosmos_container_properties = {"partition_key": partition_key}
-embeddings = GoogleGenerativeAIEmbeddings(model = "models/embedding-001")
+embedding_model = "models/embedding-001"
+# Clients are built on first use or by the startup warm-up (see lazy.py).
+base_embeddings = LazyResource("embeddings", lambda : GoogleGenerativeAIEmbeddings(model = embedding_model))
+embeddings = CachedEmbeddings(
+    base_embeddings,
+    model_name=embedding_model,
+    max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    disk_path=os.getenv("EMBEDDING_CACHE_PATH"),
+)
 
 
 indexing_policy = {
@@ -45,21 +61,106 @@ full_text_policy = {
 }
 
 
-vector_search = AzureCosmosDBNoSqlVectorSearch(
-    embedding=embeddings,
-    cosmos_client=cosmos_client,
-    vector_embedding_policy = vector_embedding_policy,
-    indexing_policy = indexing_policy,
-    database_name=database_name,
-    container_name=container_name,
-    full_text_policy=full_text_policy,
-    cosmos_container_properties=cosmos_container_properties,
-    cosmos_database_properties={},
-    full_text_search_enabled=True,
-)   
+# "cosmos" queries the DiskANN container; "local" serves a LocalVectorIndex
+# built by dev_files/ingestion_pipeline.py. Both expose similarity_search.
+vector_backend = os.getenv("VECTOR_BACKEND", "cosmos")
+local_index_path = os.getenv("LOCAL_INDEX_PATH", "vector_index")
+
+def build_vector_search(backend : str = vector_backend):
+    if backend == "local":
+        return LocalVectorIndex(local_index_path, embeddings)
+    if backend != "cosmos":
+        raise ValueError(f"Unknown VECTOR_BACKEND {backend!r}, expected 'cosmos' or 'local'")
+
+    cosmos_client = CosmosClient(cosmos_host, cosmos_key)
+    return AzureCosmosDBNoSqlVectorSearch(
+        embedding=embeddings,
+        cosmos_client=cosmos_client,
+        vector_embedding_policy = vector_embedding_policy,
+        indexing_policy = indexing_policy,
+        database_name=database_name,
+        container_name=container_name,
+        full_text_policy=full_text_policy,
+        cosmos_container_properties=cosmos_container_properties,
+        cosmos_database_properties={},
+        full_text_search_enabled=True,
+    )
+
+vector_search = LazyResource("vector_search", build_vector_search)
+
+retrieval_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_WORKERS", "64")),
+    thread_name_prefix="retrieval",
+)
+
+# "vector" runs a single similarity search; "hybrid" runs full-text and vector
+# search concurrently and fuses them with reciprocal rank fusion.
+retrieval_mode = os.getenv("RETRIEVAL_MODE", "vector")
+if retrieval_mode not in ("vector", "hybrid"):
+    raise ValueError(f"Unknown RETRIEVAL_MODE {retrieval_mode!r}, expected 'vector' or 'hybrid'")
+retrieval_k = int(os.getenv("RETRIEVAL_K", "5"))
+hybrid_k_vector = int(os.getenv("HYBRID_K_VECTOR", "20"))
+hybrid_k_text = int(os.getenv("HYBRID_K_TEXT", "20"))
+rrf_k = int(os.getenv("RRF_K", "60"))
+
+def vector_stage(query : str, k : int):
+    return vector_search.similarity_search(query=query, k=k)
+
+def full_text_stage(query : str, k : int):
+    if isinstance(vector_search.get(), LocalVectorIndex):
+        return vector_search.full_text_search(query, k=k)
+    # The Cosmos store pastes each whitespace-separated term of `query` into
+    # the SQL as a 'term' literal, so only plain tokens are passed.
+    search_text = " ".join(tokenize(query))
+    if not search_text:
+        return []
+    return vector_search.similarity_search(query=search_text, k=k, query_type=CosmosDBQueryType.FULL_TEXT_RANK)
+
+# Per-query failures of the lexical stage (service errors, timeouts). Anything
+# else is a bug or misconfiguration and propagates instead of silently
+# turning hybrid retrieval into vector-only retrieval.
+LEXICAL_STAGE_ERRORS = (AzureError, TimeoutError, ConnectionError)
+
+def fuse_hybrid(text_docs, vector_docs, k : int):
+    # A failed lexical stage degrades to plain vector retrieval instead of failing the turn.
+    if isinstance(text_docs, LEXICAL_STAGE_ERRORS):
+        print(f"Full-text stage failed, using vector results only: {text_docs!r}")
+        return vector_docs[:k]
+    if isinstance(text_docs, BaseException):
+        raise text_docs
+    return reciprocal_rank_fusion([text_docs, vector_docs], k=k, rrf_k=rrf_k)
 
 def retrival_pipeline(query : str):
-    
-    retrieved_docs = vector_search.similarity_search(query=query, k=5)
+    if retrieval_mode == "hybrid":
+        text_future = retrieval_executor.submit(full_text_stage, query, hybrid_k_text)
+        vector_docs = vector_stage(query, hybrid_k_vector)
+        return fuse_hybrid(text_future.exception() or text_future.result(), vector_docs, retrieval_k)
+
+    retrieved_docs = vector_stage(query, retrieval_k)
+    return retrieved_docs
+
+async def aretrival_pipeline(query : str, k : int | None = None):
+    k = k or retrieval_k
+    # The Cosmos client and the local index are blocking, so run them on a
+    # dedicated pool sized for concurrent sessions instead of the default executor.
+    loop = asyncio.get_running_loop()
+    if retrieval_mode == "hybrid":
+        text_docs, vector_docs = await asyncio.gather(
+            loop.run_in_executor(retrieval_executor, full_text_stage, query, hybrid_k_text),
+            loop.run_in_executor(retrieval_executor, vector_stage, query, hybrid_k_vector),
+            return_exceptions=True,
+        )
+        if isinstance(vector_docs, BaseException):
+            raise vector_docs
+        return fuse_hybrid(text_docs, vector_docs, k)
+
+    retrieved_docs = await loop.run_in_executor(retrieval_executor, vector_stage, query, k)
     return retrieved_docs
-    
+
+# Comparison retrieval: each sub-query gets its own k, merged round-robin.
+comparison_k = int(os.getenv("COMPARISON_K_PER_QUERY", "4"))
+comparison_max_docs = int(os.getenv("COMPARISON_MAX_DOCS", "8"))
+
+async def amulti_retrival_pipeline(subqueries : list[str]):
+    results = await asyncio.gather(*(aretrival_pipeline(q, comparison_k) for q in subqueries))
+    return interleave(results, comparison_max_docs)
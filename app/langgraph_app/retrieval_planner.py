@@ -0,0 +1,176 @@
+"""Query decomposition for comparison retrieval
+
+A single similarity search over "CCPA vs GDPR" tends to return chunks about
+only one of the two policies. For policy_comparison turns the query is split
+into one sub-query per policy (sharing any trailing aspect, e.g. "on data
+retention"), the sub-queries are retrieved concurrently, and the results are
+interleaved so every policy is represented in the merged context.
+"""
+import re
+
+from langgraph_app.intent_classifier import classify_by_rules
+from langgraph_app.lexical_index import document_key
+
+MAX_SUBQUERIES = 4
+
+# Leading phrasing that introduces the compared items.
+FRAME = re.compile(
+    r"^(?:(?:what|whats|what's|what is|what are)\s+(?:are\s+|is\s+)?(?:the\s+)?(?:key\s+|main\s+|major\s+)?"
+    r"(?:differences?|similarit(?:y|ies))\s+(?:between|of)\s+"
+    r"|(?:tell me\s+)?(?:the\s+)?(?:key\s+|main\s+)?(?:differences?|similarit(?:y|ies))\s+(?:between|of)\s+"
+    r"|(?:can you\s+|please\s+)*(?:compare|contrast)(?:\s+and\s+contrast)?\s+"
+    r"|how\s+(?:is|are|does|do)\s+)",
+    re.IGNORECASE,
+)
+# Separators that only ever sit between compared items.
+STRONG_SEPARATOR = re.compile(
+    r"\s+(?:vs\.?|versus|compared\s+(?:to|with)|(?:is\s+|are\s+)?different\s+from|(?:is\s+|are\s+)?similar\s+to)\s+",
+    re.IGNORECASE,
+)
+# Separators that are also common inside policy names; only used after a FRAME.
+LIST_SEPARATOR = re.compile(r"\s*,\s*(?:and\s+)?|\s+(?:and|with|to|against)\s+", re.IGNORECASE)
+# Trailing aspect shared by every compared item.
+ASPECT = re.compile(
+    r"\s+(?:on|regarding|in\s+terms\s+of|with\s+respect\s+to|when\s+it\s+comes\s+to|concerning|for)\s+",
+    re.IGNORECASE,
+)
+TRAILING_VERB = re.compile(r"\s+(?:differ|compare|stack\s+up|contrast|relate|interact|overlap)\b.*$", re.IGNORECASE)
+# Trailing reciprocal phrase; its "to"/"with" must not be taken for a separator.
+RELATION = re.compile(
+    r"\s+(?:(?:relate|compare|differ|interact|overlap|connect)\s+)?(?:to|with)\s+(?:each\s+other|one\s+another)$",
+    re.IGNORECASE,
+)
+# A bare part of some policy ("Part B", "Title II"), meaningless as a query on its own.
+PART = re.compile(r"^(?:Part|Title|Section|Sec\.|Subtitle|Chapter|Article|Schedule)\s+\S+$", re.IGNORECASE)
+PREFIXED_PART = re.compile(r"^(.+?)\s+((?:Part|Title|Section|Sec\.|Subtitle|Chapter|Article|Schedule)\s+\S+)$", re.IGNORECASE)
+# Context after the last part, shared by all of them ("... of Medicare").
+PART_CONTEXT = re.compile(r"^(.+?)\s+((?:of|under|in)\s+.+)$", re.IGNORECASE)
+# Last word of a full policy name; the capitalized words before it, joined by
+# commas or "and", belong to that name ("Food, Drug, and Cosmetic Act").
+NAME_SUFFIX = re.compile(
+    r"\b(?:Acts?|Amendments?|Code|Rules?|Regulations?|Directive|Law|Bill|Treaty|Agreement|Order)$"
+)
+
+
+def clean_item(item : str) -> str:
+    item = TRAILING_VERB.sub("", item)
+    item = re.sub(r"^(?:the|between)\s+", "", item.strip(), flags=re.IGNORECASE)
+    return item.strip(" \"'`.,;:")
+
+
+def is_name_fragment(piece : str) -> bool:
+    """Capitalized words that are not yet a complete name (not an acronym, no suffix)."""
+    words = clean_item(piece).split()
+    return bool(words) and all(w[:1].isupper() for w in words) and not any(w.isupper() for w in words) \
+        and not NAME_SUFFIX.search(words[-1])
+
+
+def split_list(text : str) -> list[str]:
+    """Splits on LIST_SEPARATOR, except inside a capitalized policy name."""
+    pieces = LIST_SEPARATOR.split(text)
+    separators = LIST_SEPARATOR.findall(text)
+    items = [pieces[-1]]
+    for piece, separator in zip(reversed(pieces[:-1]), reversed(separators)):
+        name = clean_item(items[0])
+        if is_name_fragment(piece) and name[:1].isupper() and NAME_SUFFIX.search(name):
+            items[0] = piece + separator + items[0]
+        else:
+            items.insert(0, piece)
+    return items
+
+
+def looks_like_name(item : str, cased : bool) -> bool:
+    # In a query that capitalizes names, an item without a capitalized word
+    # or number ("rights of tenants") is a phrase, not a policy. All-lowercase
+    # queries give no signal, so their items are accepted.
+    return not cased or any(word[:1].isupper() or word[:1].isdigit() for word in item.split())
+
+
+def share_part_context(items : list[str]) -> list[str] | None:
+    """
+    When several items are parts of one policy, bare parts ("Part B") get the
+    policy they belong to: a prefix of the first item ("Medicare Part A to
+    Part B") or a trailing "of/under/in ..." of the last one ("Part A and
+    Part B of Medicare"). None if there is no such context.
+    """
+    def is_part(item):
+        contextual = PART_CONTEXT.match(item)
+        return PART.match(item) or PREFIXED_PART.match(item) or (contextual and PART.match(contextual.group(1)))
+
+    if sum(bool(is_part(item)) for item in items) < 2:
+        return items
+    prefix = suffix = ""
+    prefixed = PREFIXED_PART.match(items[0])
+    if prefixed and not PART.match(items[0]):
+        prefix = prefixed.group(1)
+    contextual = PART_CONTEXT.match(items[-1])
+    if contextual and PART.match(contextual.group(1)):
+        items = items[:-1] + [contextual.group(1)]
+        suffix = contextual.group(2)
+
+    shared = []
+    for item in items:
+        if PART.match(item):
+            if not prefix and not suffix:
+                return None
+            item = f"{prefix} {item} {suffix}".strip()
+        shared.append(item)
+    return shared
+
+
+def plan_subqueries(query : str, max_subqueries : int = MAX_SUBQUERIES) -> list[str]:
+    """One sub-query per compared policy, or `[query]` when it does not decompose."""
+    text = " ".join(query.split()).rstrip("?.! ")
+    framed = FRAME.match(text)
+    if framed:
+        text = text[framed.end():]
+
+    # The aspect comes off first, so its own words ("with respect to",
+    # "tenants and landlords") are never taken for list separators.
+    text, *aspect = ASPECT.split(text, maxsplit=1)
+    aspect = RELATION.sub("", aspect[0]) if aspect else ""
+    text = RELATION.sub("", text)
+
+    items = STRONG_SEPARATOR.split(text)
+    if len(items) < 2 and framed:
+        items = split_list(text)
+    items = [clean_item(item) for item in items]
+    cased = query != query.lower()
+    if len(items) < 2 or not all(items) or not all(looks_like_name(item, cased) for item in items):
+        return [query]
+    items = share_part_context(items)
+    if items is None:
+        return [query]
+
+    subqueries = []
+    for item in items:
+        subquery = f"{item} {aspect}".strip()
+        if subquery.lower() not in (s.lower() for s in subqueries):
+            subqueries.append(subquery)
+    if len(subqueries) < 2:
+        return [query]
+    return subqueries[:max_subqueries]
+
+
+def wants_decomposition(query : str, intent : str | None) -> bool:
+    # intent is unset for tool calls made by fused_node, so fall back to the rules.
+    if intent is not None:
+        return intent == "policy_comparison"
+    return classify_by_rules(query)[0] == "policy_comparison"
+
+
+def interleave(result_lists : list[list], max_docs : int) -> list:
+    """Round-robin merge of ranked Document lists, dropping duplicates."""
+    merged, seen = [], set()
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            key = document_key(results[rank])
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(results[rank])
+            if len(merged) == max_docs:
+                return merged
+    return merged
@@ -1,3 +1,5 @@
+from typing import Literal
+from pydantic import BaseModel, Field
 from langgraph.graph import MessagesState
 
 class AgentInputState(MessagesState):
@@ -11,3 +13,11 @@ class AgentState(MessagesState):
     query : str
     context : str | None
     response : str
+    summary : str
+
+class IntentAnswer(BaseModel):
+    """Final answer to the user together with the intent it was written for"""
+    intent : Literal["eli5", "extract_entities", "policy_comparison", "general_qa"] = Field(
+        description="Intent of the most recent user question"
+    )
+    answer : str = Field(description="Complete answer to the user, written in the persona for the intent")
@@ -0,0 +1,22 @@
+"""Offline token estimates for prompts and conversation history
+
+Gemini's count_tokens is a network call, so budgets and triggers use the usual
+~4 characters per token approximation instead.
+"""
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text : str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_text(message) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    # Multi-part content: keep only the text parts.
+    return " ".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+
+
+def messages_tokens(messages) -> int:
+    return sum(estimate_tokens(message_text(m)) + estimate_tokens(str(getattr(m, "tool_calls", "") or "")) for m in messages)
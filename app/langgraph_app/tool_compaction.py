@@ -0,0 +1,137 @@
+"""Compaction of retrieval and web search results before they reach the model
+
+Each tool result becomes a numbered citation plus a query-focused extract:
+near-duplicate chunks (e.g. the overlap between neighbouring splits) are
+dropped, metadata is reduced to what a citation needs, and every result is
+capped to the sentences that best match the query.
+"""
+import os
+import re
+import threading
+
+from langgraph_app.lexical_index import tokenize
+
+MAX_RESULTS = int(os.getenv("TOOL_MAX_RESULTS", "5"))
+MAX_CHARS_PER_RESULT = int(os.getenv("TOOL_RESULT_MAX_CHARS", "800"))
+DUPLICATE_THRESHOLD = 0.6
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.;:!?])\s+|\n+")
+
+
+def shingles(text : str, size : int = 5) -> set[tuple[str, ...]]:
+    words = text.lower().split()
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def is_duplicate(candidate : set, kept : list[set]) -> bool:
+    # Containment rather than Jaccard, so a chunk mostly repeated inside a
+    # longer neighbour also counts.
+    return any(len(candidate & other) / max(min(len(candidate), len(other)), 1) >= DUPLICATE_THRESHOLD for other in kept)
+
+
+def focused_extract(text : str, query : str, max_chars : int = MAX_CHARS_PER_RESULT) -> str:
+    """Highest query-overlap sentences, returned in their original order."""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+
+    query_terms = set(tokenize(query))
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+    overlap = [len(query_terms & set(tokenize(sentence))) for sentence in sentences]
+    scored = sorted(range(len(sentences)), key=lambda i: (-overlap[i], i))
+    # Sentences sharing no query term only fill in when nothing matched.
+    if overlap[scored[0]]:
+        scored = [i for i in scored if overlap[i]]
+    chosen, used = [], 0
+    for i in scored:
+        # Reserve room for a " ... " gap marker after every sentence.
+        if used + len(sentences[i]) + 5 > max_chars:
+            continue
+        chosen.append(i)
+        used += len(sentences[i]) + 5
+    if not chosen:
+        return sentences[scored[0]][:max_chars - 3].rstrip() + "..."
+
+    chosen.sort()
+    extract = sentences[chosen[0]]
+    for previous, i in zip(chosen, chosen[1:]):
+        extract += (" " if i == previous + 1 else " ... ") + sentences[i]
+    return extract
+
+
+def document_citation(metadata : dict) -> str:
+    if metadata.get("bill_id"):
+        citation = metadata["bill_id"]
+        if metadata.get("section"):
+            citation += f", Sec. {metadata['section']}"
+        if metadata.get("section_header"):
+            citation += f" ({metadata['section_header']})"
+        return citation
+    source = metadata.get("source") or metadata.get("url") or "local corpus"
+    return os.path.basename(source) if os.path.sep in source else source
+
+
+def format_results(entries : list[tuple[str, str]]) -> str:
+    if not entries:
+        return "No results found."
+    return "\n\n".join(f"[{i}] {citation}\n{extract}" for i, (citation, extract) in enumerate(entries, start=1))
+
+
+class CompactionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.raw_chars = 0
+        self.compact_chars = 0
+        self.duplicates_dropped = 0
+
+    def record(self, raw_chars : int, compact_chars : int, duplicates : int):
+        with self._lock:
+            self.calls += 1
+            self.raw_chars += raw_chars
+            self.compact_chars += compact_chars
+            self.duplicates_dropped += duplicates
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "calls" : self.calls,
+                "raw_chars" : self.raw_chars,
+                "compact_chars" : self.compact_chars,
+                "duplicates_dropped" : self.duplicates_dropped,
+                "reduction" : 1 - self.compact_chars / self.raw_chars if self.raw_chars else 0.0,
+            }
+
+
+compaction_stats = CompactionStats()
+
+
+def compact_entries(query : str, items : list[tuple[str, str]], raw_chars : int, max_results : int = MAX_RESULTS) -> str:
+    kept_shingles, entries, duplicates = [], [], 0
+    for citation, text in items:
+        candidate = shingles(text)
+        if is_duplicate(candidate, kept_shingles):
+            duplicates += 1
+            continue
+        kept_shingles.append(candidate)
+        entries.append((citation, focused_extract(text, query)))
+        if len(entries) == max_results:
+            break
+
+    output = format_results(entries)
+    compaction_stats.record(raw_chars, len(output), duplicates)
+    return output
+
+
+def compact_documents(query : str, documents : list, max_results : int = MAX_RESULTS) -> str:
+    items = [(document_citation(doc.metadata), doc.page_content) for doc in documents]
+    raw_chars = sum(len(doc.page_content) + len(str(doc.metadata)) for doc in documents)
+    return compact_entries(query, items, raw_chars, max_results)
+
+
+def compact_web_results(query : str, results : list[dict]) -> str:
+    items = [
+        (f"{result.get('title') or 'Untitled'} - {result.get('url', '')}".strip(" -"), result.get("content") or "")
+        for result in results
+    ]
+    return compact_entries(query, items, len(str(results)))
@@ -0,0 +1,76 @@
+"""Concurrent tool stage with per-tool timeouts, replacing ToolNode(tools)
+
+Every tool call in the last AI message starts at once. A call that exceeds its
+timeout is cancelled and answered with a placeholder ToolMessage, and a call
+that raises gets an error ToolMessage, so the turn always continues and takes
+as long as the slowest allowed tool rather than the sum of all of them.
+"""
+import asyncio
+import threading
+import time
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.tools import BaseTool, tool as as_tool
+
+
+class ParallelToolNode:
+    def __init__(self, tools : list, timeouts : dict[str, float] | None = None, default_timeout : float = 20.0):
+        self.tools_by_name : dict[str, BaseTool] = {}
+        for t in tools:
+            t = t if isinstance(t, BaseTool) else as_tool(t)
+            self.tools_by_name[t.name] = t
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.timeouts_hit = 0
+        self.errors = 0
+
+    def timeout_for(self, name : str) -> float:
+        return self.timeouts.get(name, self.default_timeout)
+
+    async def _run_call(self, call : dict, config) -> ToolMessage:
+        name = call["name"]
+        timeout = self.timeout_for(name)
+        tool = self.tools_by_name.get(name)
+        if tool is None:
+            return self._message(call, f"Error: {name} is not a valid tool, try one of {sorted(self.tools_by_name)}.", "error")
+
+        start = time.perf_counter()
+        try:
+            # wait_for cancels the tool's coroutine; work already handed to an
+            # executor thread finishes in the background and is discarded.
+            content = await asyncio.wait_for(tool.ainvoke(call["args"], config), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts_hit += 1
+            print(f"Tool {name} timed out after {timeout:.1f}s")
+            return self._message(
+                call,
+                f"{name} did not respond within {timeout:.0f}s, so no results are available from it. "
+                "Answer with the other tool results or your own knowledge, and mention the gap if it matters.",
+                "error",
+            )
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"Tool {name} failed after {time.perf_counter() - start:.2f}s: {e}")
+            return self._message(call, f"Error: {name} failed ({e}). Answer without it.", "error")
+        return self._message(call, content, "success")
+
+    def _message(self, call : dict, content, status : str) -> ToolMessage:
+        return ToolMessage(content=content if isinstance(content, str) else str(content),
+                           name=call["name"], tool_call_id=call["id"], status=status)
+
+    async def __call__(self, state, config) -> dict:
+        message = next(m for m in reversed(state["messages"]) if isinstance(m, AIMessage))
+        with self._lock:
+            self.calls += len(message.tool_calls)
+        # Tools read the turn's intent from their config (langgraph.config.get_config).
+        config = {**config, "configurable" : {**config.get("configurable", {}), "intent" : state.get("intent")}}
+        results = await asyncio.gather(*(self._run_call(call, config) for call in message.tool_calls))
+        return {"messages" : list(results)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls" : self.calls, "timeouts" : self.timeouts_hit, "errors" : self.errors}
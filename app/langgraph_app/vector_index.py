@@ -0,0 +1,188 @@
+"""Local in-process vector index, an offline alternative to Cosmos DiskANN
+
+On-disk layout of an index directory:
+
+    meta.json        dimensions, count and whether an HNSW graph was built
+    vectors.f32      row-major float32 matrix of L2-normalized embeddings (memory-mapped)
+    documents.jsonl  one {"id", "page_content", "metadata"} record per row
+    offsets.i64      byte offset of every record in documents.jsonl
+    hnsw.bin         optional hnswlib graph for approximate search
+
+`LocalVectorIndex` exposes the same `similarity_search(query, k)` call as
+`AzureCosmosDBNoSqlVectorSearch`, so `retrival_pipeline` can use either, plus
+a BM25 `full_text_search` for hybrid retrieval.
+"""
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+
+from langgraph_app.lexical_index import BM25Index
+
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+DOCUMENTS_FILE = "documents.jsonl"
+OFFSETS_FILE = "offsets.i64"
+HNSW_FILE = "hnsw.bin"
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class LocalIndexWriter:
+    """
+    Appends documents and their embeddings batch by batch, so the ingestion
+    pipeline never has to hold the whole corpus in memory.
+    """
+
+    def __init__(self, path : str, dimensions : int = 768):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dimensions = dimensions
+        self.count = 0
+        self._vectors = open(os.path.join(path, VECTORS_FILE), "wb")
+        self._documents = open(os.path.join(path, DOCUMENTS_FILE), "wb")
+        self._offsets = open(os.path.join(path, OFFSETS_FILE), "wb")
+        self._lock = threading.Lock()
+
+    def add(self, documents : list[Document], vectors : list[list[float]], ids : list[str] | None = None):
+        matrix = normalize_rows(vectors)
+        if matrix.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-d embeddings, got {matrix.shape[1]}")
+
+        with self._lock:
+            self._vectors.write(matrix.tobytes())
+            for i, doc in enumerate(documents):
+                record = {
+                    "id" : ids[i] if ids else doc.id or str(self.count + i),
+                    "page_content" : doc.page_content,
+                    "metadata" : doc.metadata,
+                }
+                self._offsets.write(np.int64(self._documents.tell()).tobytes())
+                self._documents.write(json.dumps(record).encode() + b"\n")
+            self.count += len(documents)
+
+    def close(self, build_hnsw : bool = False, m : int = 16, ef_construction : int = 200):
+        with self._lock:
+            self._vectors.close()
+            self._documents.close()
+            self._offsets.close()
+
+        hnsw = False
+        if build_hnsw and self.count:
+            hnsw = build_hnsw_index(self.path, self.count, self.dimensions, m, ef_construction)
+
+        with open(os.path.join(self.path, META_FILE), "w") as f:
+            json.dump({"dimensions" : self.dimensions, "count" : self.count, "hnsw" : hnsw}, f)
+
+
+def build_hnsw_index(path : str, count : int, dimensions : int, m : int = 16, ef_construction : int = 200) -> bool:
+    try:
+        import hnswlib
+    except ImportError:
+        print("hnswlib is not installed, the local index will use exact search only")
+        return False
+
+    vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dimensions))
+    index = hnswlib.Index(space="cosine", dim=dimensions)
+    index.init_index(max_elements=count, ef_construction=ef_construction, M=m)
+    batch_size = 10000
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        index.add_items(np.asarray(vectors[start:stop]), np.arange(start, stop))
+    index.save_index(os.path.join(path, HNSW_FILE))
+    return True
+
+
+class LocalVectorIndex:
+    """
+    Exact search is a single matrix-vector product over the memory-mapped
+    embeddings. When an HNSW graph exists and the corpus is larger than
+    `exact_search_limit`, the approximate index is used instead.
+    """
+
+    def __init__(self, path : str, embedding, exact_search_limit : int = 200_000):
+        self.path = path
+        self.embedding = embedding
+        self.exact_search_limit = exact_search_limit
+
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.dimensions = meta["dimensions"]
+        self.count = meta["count"]
+
+        # mmap cannot map an empty file
+        self.vectors = np.memmap(
+            os.path.join(path, VECTORS_FILE), dtype=np.float32, mode="r", shape=(self.count, self.dimensions)
+        ) if self.count else np.zeros((0, self.dimensions), dtype=np.float32)
+        self.offsets = np.fromfile(os.path.join(path, OFFSETS_FILE), dtype=np.int64)
+        self._documents_file = open(os.path.join(path, DOCUMENTS_FILE), "rb")
+        # mmap cannot map an empty file
+        self._documents = mmap.mmap(self._documents_file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b""
+
+        self._bm25 = None
+        self._bm25_lock = threading.Lock()
+
+        self.hnsw = None
+        if meta.get("hnsw") and self.count > exact_search_limit:
+            import hnswlib
+            self.hnsw = hnswlib.Index(space="cosine", dim=self.dimensions)
+            self.hnsw.load_index(os.path.join(path, HNSW_FILE), max_elements=self.count)
+
+    def document(self, row : int) -> Document:
+        start = int(self.offsets[row])
+        end = int(self.offsets[row + 1]) if row + 1 < self.count else len(self._documents)
+        record = json.loads(self._documents[start:end])
+        return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+
+    def iter_rows(self, batch_size : int = 1000):
+        """Yields (documents, vectors) batches in row order, e.g. to rewrite the index."""
+        for start in range(0, self.count, batch_size):
+            stop = min(start + batch_size, self.count)
+            yield [self.document(row) for row in range(start, stop)], np.asarray(self.vectors[start:stop])
+
+    def close(self):
+        if self.count:
+            self._documents.close()
+        self._documents_file.close()
+        self.vectors = None
+
+    def search_by_vector(self, vector, k : int = 5) -> list[tuple[int, float]]:
+        """Returns (row, cosine similarity) pairs, best first."""
+        if self.count == 0:
+            return []
+        query = normalize_rows(vector)
+        k = min(k, self.count)
+
+        if self.hnsw is not None:
+            self.hnsw.set_ef(max(64, 4 * k))
+            labels, distances = self.hnsw.knn_query(query, k=k)
+            return [(int(row), 1.0 - float(distance)) for row, distance in zip(labels[0], distances[0])]
+
+        scores = self.vectors @ query
+        if k < self.count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(self.count)
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def similarity_search_with_score(self, query : str, k : int = 5) -> list[tuple[Document, float]]:
+        vector = self.embedding.embed_query(query)
+        return [(self.document(row), score) for row, score in self.search_by_vector(vector, k)]
+
+    def similarity_search(self, query : str, k : int = 5) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def full_text_search(self, query : str, k : int = 5) -> list[Document]:
+        # The BM25 postings are built from documents.jsonl on first use.
+        with self._bm25_lock:
+            if self._bm25 is None:
+                self._bm25 = BM25Index(self.document(row).page_content for row in range(self.count))
+        return [self.document(row) for row, _ in self._bm25.search(query, k)]
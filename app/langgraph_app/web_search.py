@@ -0,0 +1,121 @@
+"""TTL cache with single-flight coalescing in front of Tavily search
+
+Results are cached per normalized query for `ttl` seconds (LRU bounded).
+Concurrent identical searches that miss share one outbound call instead of
+each hitting Tavily. `FakeTavilyClient` stands in for AsyncTavilyClient in
+local runs and benchmarks (WEB_SEARCH_BACKEND=fake).
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+from langgraph_app.answer_cache import normalize_query
+
+
+class CachedWebSearch:
+    def __init__(self, client, ttl : float = 900, max_entries : int = 1000):
+        self.client = client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires_at, response, fetch_latency)
+        self._entries : OrderedDict[str, tuple[float, dict, float]] = OrderedDict()
+        self._inflight : dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_latency = 0.0
+
+    def _cached(self, key : str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response, latency = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_latency += latency
+            return response
+
+    def _store(self, key : str, response : dict, latency : float):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, response, latency)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _fetch(self, key : str, query : str) -> tuple[dict, float]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.search(query)
+            latency = time.perf_counter() - start
+            self._store(key, response, latency)
+            return response, latency
+        finally:
+            self._inflight.pop(key, None)
+
+    async def search(self, query : str) -> dict:
+        key = normalize_query(query)
+        response = self._cached(key)
+        if response is not None:
+            return response
+
+        task = self._inflight.get(key)
+        if task is None:
+            with self._lock:
+                self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, query))
+            self._inflight[key] = task
+            # Shielded so a caller timing out does not cancel the shared call.
+            response, _ = await asyncio.shield(task)
+            return response
+
+        with self._lock:
+            self.coalesced += 1
+        response, latency = await asyncio.shield(task)
+        with self._lock:
+            self.saved_latency += latency
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries" : len(self._entries),
+                "hits" : self.hits,
+                "misses" : self.misses,
+                "coalesced" : self.coalesced,
+                "hit_rate" : (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "saved_latency_s" : round(self.saved_latency, 3),
+            }
+
+
+class FakeTavilyClient:
+    """Offline AsyncTavilyClient stand-in with a fixed latency and canned results."""
+
+    def __init__(self, latency : float = 0.5, results : list[dict] | None = None):
+        self.latency = latency
+        self.results = results
+        self.calls = 0
+
+    async def search(self, query : str, **kwargs) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        results = self.results or [
+            {
+                "title" : f"Result {i} for {query}",
+                "url" : f"https://example.com/search/{i}",
+                "content" : f"Placeholder web content {i} about {query}.",
+                "score" : 1.0 - i / 10,
+            }
+            for i in range(1, 4)
+        ]
+        return {"query" : query, "results" : results, "response_time" : self.latency}
@@ -1,12 +1,57 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import sys,os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__),'..')))
 
-from fastapi import FastAPI, Header
+import json
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from langgraph_app.agent_graph import *
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.utils.json import parse_partial_json
+from langgraph_app.checkpointer import run_maintenance
+from langgraph_app.lazy import readiness, warm_up
+from langgraph_app.metrics import render_metrics, stats_samples
+from langgraph_app.prompt_builder import prompt_stats
+from langgraph_app.tool_compaction import compaction_stats
 from pydantic import BaseModel
 from typing import Annotated
 
-app = FastAPI()
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+print(f"Imported app in {IMPORT_SECONDS:.2f}s")
+ready_seconds = None
+
+async def warm_up_resources():
+    """Builds Cosmos / embeddings / Tavily clients after startup; /ready reports progress."""
+    global ready_seconds
+    await warm_up(retries=int(os.getenv("WARMUP_RETRIES", "5")), backoff=float(os.getenv("WARMUP_BACKOFF", "1")))
+    if readiness()[0]:
+        ready_seconds = time.perf_counter() - IMPORT_STARTED
+        print(f"Ready {ready_seconds:.2f}s after import started")
+
+@asynccontextmanager
+async def lifespan(app : FastAPI):
+    await open_checkpointer()
+    # Runs in the background so the server starts listening immediately and a
+    # briefly unreachable backend delays readiness instead of failing startup.
+    warmup = asyncio.create_task(warm_up_resources())
+    maintenance = asyncio.create_task(run_maintenance(
+        checkpoint_store,
+        ttl=float(os.getenv("SESSION_TTL", "86400")),
+        keep=int(os.getenv("CHECKPOINT_KEEP_VERSIONS", "5")),
+        interval=float(os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL", "300")),
+    ))
+    yield
+    warmup.cancel()
+    maintenance.cancel()
+    await checkpoint_store.close()
+
+app = FastAPI(lifespan=lifespan)
 
 class QueryRequest(BaseModel):
     query : str
@@ -16,10 +61,251 @@ class QueryResponse(BaseModel):
     response : str
 
 
+async def lookup_answer(request : QueryRequest, config : dict):
+    """
+    Returns (cached response, query vector, has_history). Only first turns use
+    the shared cache: any later turn may be answered from that session's
+    history, even without a follow-up marker ("What penalties apply?"), so
+    its answer must neither be served from nor stored in the cache.
+    """
+    if request.session_id:
+        await checkpoint_store.touch(request.session_id)
+    if answer_cache is None:
+        return None, None, False
+
+    has_history = False
+    if request.session_id:
+        snapshot = await graph.aget_state(config)
+        has_history = bool(snapshot.values.get("messages"))
+    if has_history:
+        answer_cache.bypass()
+        return None, None, True
+
+    # Entries are keyed by intent, so only confidently rule-labelled queries
+    # use the cache; classify_by_rules leaves the classifier's stats alone.
+    intent, confidence = classify_by_rules(request.query)
+    if intent is None or confidence < intent_classifier.threshold:
+        answer_cache.bypass()
+        return None, None, False
+    try:
+        cached, vector = await answer_cache.lookup(request.query, intent)
+    except Exception as e:
+        # The cache is an optimization; the graph can still answer.
+        print(f"Answer cache lookup failed, treating as a miss: {e!r}")
+        return None, None, False
+    if cached is not None and request.session_id:
+        # Keep the session transcript complete so later follow-ups still work.
+        await graph.aupdate_state(
+            config,
+            {"messages" : [HumanMessage(content=request.query), AIMessage(content=cached)]},
+            as_node="llm_node",
+        )
+    return cached, vector, False
+
+def store_answer(request : QueryRequest, vector, has_history : bool, state : dict):
+    if answer_cache is None or has_history or vector is None or not state.get("intent"):
+        return
+    answer_cache.store(request.query, state["intent"], vector, state["messages"][-1].content)
+
+async def answer_query(request : QueryRequest, config : dict) -> tuple[str, bool]:
+    """Answers one turn from the answer cache or the graph; returns (response, cached)."""
+    cached, vector, has_history = await lookup_answer(request, config)
+    if cached is not None:
+        return cached, True
+
+    messages = {"messages" : [{"role" : "user", "content" : f"{request.query}"}]}
+    response = await graph.ainvoke(messages,config)
+    store_answer(request, vector, has_history, response)
+    return response["messages"][-1].content, False
+
 @app.post("/chat")
-async def call_llm(request : QueryRequest, api_key : Annotated[str | None, Header()] = None):
+async def call_llm(request : QueryRequest, background_tasks : BackgroundTasks, api_key : Annotated[str | None, Header()] = None):
+    config = {"configurable" : {"thread_id" : request.session_id, "api_key" : f"{api_key}"}}
+    # Runs after the response is sent, off the user-facing path.
+    background_tasks.add_task(summarize_session, config)
+    response, _ = await answer_query(request, config)
+    return QueryResponse(response=response)
+
+
+def sse_event(event : str, data : dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class AnswerArgStream:
+    """
+    GRAPH_MODE=single_call answers inside the IntentAnswer tool call, so the
+    text is recovered from the streamed tool-call argument chunks. Gemini
+    sends function-call arguments whole, so there the answer arrives as one
+    token event when the call completes rather than word by word.
+    """
+
+    def __init__(self):
+        self._calls : dict[tuple, dict] = {}
+
+    def delta(self, message) -> str:
+        text = ""
+        for chunk in getattr(message, "tool_call_chunks", None) or []:
+            call = self._calls.setdefault((message.id, chunk.get("index")), {"name" : None, "args" : "", "sent" : 0})
+            call["name"] = call["name"] or chunk.get("name")
+            call["args"] += chunk.get("args") or ""
+            if call["name"] != IntentAnswer.__name__:
+                continue
+            try:
+                answer = (parse_partial_json(call["args"]) or {}).get("answer")
+            except ValueError:
+                continue
+            if isinstance(answer, str) and len(answer) > call["sent"]:
+                text += answer[call["sent"]:]
+                call["sent"] = len(answer)
+        return text
+
+async def stream_chat(request : QueryRequest, messages : dict, config : dict):
+    # Headers are already sent once this runs, so failures become a final
+    # "error" event instead of an aborted connection.
+    try:
+        cached, vector, has_history = await lookup_answer(request, config)
+        if cached is not None:
+            yield sse_event("done", {"response" : cached, "cached" : True})
+            return
+
+        # "messages" yields LLM tokens as they are generated, "custom" carries the
+        # progress events tools write through get_stream_writer.
+        answer_stream = AnswerArgStream()
+        async for mode, chunk in graph.astream(messages, config, stream_mode=["messages", "custom"]):
+            if mode == "messages":
+                message, metadata = chunk
+                node = metadata.get("langgraph_node")
+                if node == "llm_node" and isinstance(message.content, str) and message.content:
+                    yield sse_event("token", {"content" : message.content})
+                elif node == "fused_node":
+                    delta = answer_stream.delta(message)
+                    if delta:
+                        yield sse_event("token", {"content" : delta})
+            elif mode == "custom":
+                yield sse_event(chunk.get("event", "progress"), chunk)
+
+        state = await graph.aget_state(config)
+        store_answer(request, vector, has_history, state.values)
+        yield sse_event("done", {"response" : state.values["messages"][-1].content})
+    except Exception as e:
+        print(f"Stream failed for session {request.session_id}: {e!r}")
+        yield sse_event("error", {"message" : f"{type(e).__name__}: {e}"})
+
+@app.post("/chat/stream")
+async def call_llm_stream(request : QueryRequest, api_key : Annotated[str | None, Header()] = None):
     messages = {"messages" : [{"role" : "user", "content" : f"{request.query}"}]}
     config = {"configurable" : {"thread_id" : request.session_id, "api_key" : f"{api_key}"}}
-    response = graph.invoke(messages,config)
-    res = QueryResponse(response=response["messages"][-1].content)
-    return res
\ No newline at end of file
+    return StreamingResponse(
+        stream_chat(request, messages, config),
+        media_type="text/event-stream",
+        headers={"Cache-Control" : "no-cache", "X-Accel-Buffering" : "no"},
+        background=BackgroundTask(summarize_session, config),
+    )
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "5000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+
+async def stream_batch(requests : list[QueryRequest], api_key : str | None, concurrency : int):
+    """
+    Yields one NDJSON line per request as it completes. Session-less items run
+    in throwaway threads, and identical session-less questions are answered
+    once; items of the same session run in order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    shared : dict[str, asyncio.Future] = {}
+    session_tails : dict[str, asyncio.Future] = {}
+
+    async def answer(request : QueryRequest, after : asyncio.Future | None):
+        if after is not None:
+            await asyncio.wait([after])
+        thread_id = request.session_id or f"batch-{uuid.uuid4()}"
+        config = {"configurable" : {"thread_id" : thread_id, "api_key" : f"{api_key}"}}
+        async with semaphore:
+            try:
+                return await answer_query(request, config)
+            finally:
+                if not request.session_id:
+                    await checkpoint_store.saver.adelete_thread(thread_id)
+
+    async def item(index : int, request : QueryRequest) -> dict:
+        result = {"index" : index, "session_id" : request.session_id}
+        if request.session_id:
+            future = asyncio.ensure_future(answer(request, session_tails.get(request.session_id)))
+            session_tails[request.session_id] = future
+            first = True
+        else:
+            key = normalize_query(request.query)
+            first = key not in shared
+            if first:
+                shared[key] = asyncio.ensure_future(answer(request, None))
+            future = asyncio.shield(shared[key])
+        try:
+            response, cached = await future
+        except Exception as e:
+            return {**result, "error" : f"{type(e).__name__}: {e}"}
+        return {**result, "response" : response, "cached" : cached or not first}
+
+    # Items are scheduled in order, so session chains and shared futures exist
+    # before anything that depends on them runs.
+    tasks = [asyncio.ensure_future(item(i, request)) for i, request in enumerate(requests)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done) + "\n"
+    finally:
+        # Client went away: stop the remaining work.
+        for task in tasks:
+            task.cancel()
+        for future in list(shared.values()) + list(session_tails.values()):
+            future.cancel()
+
+async def summarize_sessions(configs : list[dict]):
+    for config in configs:
+        await summarize_session(config)
+
+@app.post("/chat/batch")
+async def call_llm_batch(requests : list[QueryRequest], concurrency : int | None = None, api_key : Annotated[str | None, Header()] = None):
+    """Runs many independent questions with bounded concurrency; results stream back as NDJSON."""
+    if len(requests) > BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_SIZE} requests per batch")
+    concurrency = max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    session_ids = dict.fromkeys(r.session_id for r in requests if r.session_id)
+    configs = [{"configurable" : {"thread_id" : session_id, "api_key" : f"{api_key}"}} for session_id in session_ids]
+    return StreamingResponse(
+        stream_batch(requests, api_key, concurrency),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(summarize_sessions, configs),
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition: node/tool/turn histograms, tokens and cache/pool stats."""
+    samples = (
+        stats_samples("agent_llm_pool", llm_pool.stats())
+        + stats_samples("agent_embedding_cache", embeddings.stats())
+        + stats_samples("agent_web_search_cache", web_search.stats())
+        + stats_samples("agent_intent_classifier", intent_classifier.stats())
+        + stats_samples("agent_tool_executor", tool_node.stats())
+        + stats_samples("agent_tool_compaction", compaction_stats.stats())
+        + stats_samples("agent_checkpoints", await checkpoint_store.stats())
+    )
+    if answer_cache is not None:
+        samples += stats_samples("agent_answer_cache", answer_cache.stats())
+    for intent, values in prompt_stats.stats().items():
+        samples += stats_samples("agent_prompt", values, intent=intent)
+    return PlainTextResponse(render_metrics(samples), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once every required backend client is built, else 503."""
+    global ready_seconds
+    is_ready, resources = readiness()
+    if is_ready and ready_seconds is None:
+        # Built lazily by requests after the warm-up gave up.
+        ready_seconds = time.perf_counter() - IMPORT_STARTED
+    body = {
+        "ready" : is_ready,
+        "import_seconds" : round(IMPORT_SECONDS, 3),
+        "ready_seconds" : round(ready_seconds, 3) if ready_seconds is not None else None,
+        "resources" : resources,
+    }
+    return JSONResponse(body, status_code=200 if is_ready else 503)
@@ -0,0 +1,247 @@
+"""Offline benchmark of the agent graph and the /chat API against fakes.
+
+No API quota is used: Gemini, embeddings, Cosmos and Tavily are replaced by
+the deterministic stand-ins in dev_files/fakes.py, each with a configurable
+latency. Run from the repository root:
+
+    python dev_files/benchmark.py --target both --levels 1 10 50 --turns 1 5
+    python dev_files/benchmark.py --target graph --llm-latency 0 --vector-latency 0   # pure graph overhead
+
+For every (target, concurrency, turns per session) it reports end-to-end
+p50/p95/p99, throughput, per-node and per-tool latency and the growth of the
+checkpointer (sessions, checkpoints, bytes, Python heap via tracemalloc).
+
+The API target runs the FastAPI app in-process over httpx's ASGI transport,
+so its latency includes background tasks (summarize_session) that a real
+server runs after the response; use load_test.py for wire latency.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import fakes
+
+parser = argparse.ArgumentParser(description="Offline benchmark with faked Gemini / embeddings / Cosmos / Tavily")
+parser.add_argument("--target", choices=["graph", "api", "both"], default="both")
+parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50], help="concurrent sessions")
+parser.add_argument("--turns", type=int, nargs="+", default=[1, 5], help="turns per session")
+parser.add_argument("--sessions", type=int, default=None, help="sessions per run, defaults to 2x the level")
+parser.add_argument("--llm-latency", type=float, default=0.4)
+parser.add_argument("--llm-token-latency", type=float, default=0.0)
+parser.add_argument("--embedding-latency", type=float, default=0.05)
+parser.add_argument("--vector-latency", type=float, default=0.1)
+parser.add_argument("--web-latency", type=float, default=0.5)
+parser.add_argument("--web-search-rate", type=float, default=0.2, help="share of turns that also search the web")
+parser.add_argument("--answer-tokens", type=int, default=150)
+parser.add_argument("--checkpointer", choices=["memory", "sqlite"], default="sqlite")
+parser.add_argument("--graph-mode", choices=["two_stage", "single_call"], default=os.getenv("GRAPH_MODE", "two_stage"))
+parser.add_argument("--answer-cache", action="store_true", help="keep the semantic answer cache on (off by default)")
+args = parser.parse_args()
+
+fakes.install(
+    latencies={
+        "llm" : args.llm_latency,
+        "llm_per_token" : args.llm_token_latency,
+        "embedding" : args.embedding_latency,
+        "vector_search" : args.vector_latency,
+        "web_search" : args.web_latency,
+    },
+    answer_tokens=args.answer_tokens,
+    web_search_rate=args.web_search_rate,
+)
+workdir = tempfile.mkdtemp(prefix="benchmark-")
+os.environ["CHECKPOINTER"] = args.checkpointer
+os.environ["CHECKPOINTER_URL"] = os.path.join(workdir, "checkpoints.sqlite")
+os.environ["GRAPH_MODE"] = args.graph_mode
+os.environ["ANSWER_CACHE_ENABLED"] = "true" if args.answer_cache else "false"
+os.environ.pop("EMBEDDING_CACHE_PATH", None)
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+
+from langgraph_app import agent_graph
+from load_test import QUERIES
+
+
+def percentile(values : list[float], q : float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Collects per-node and per-tool wall time from LangChain run callbacks."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.starts : dict = {}
+        self.durations : dict[str, list[float]] = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata = None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self.starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self.starts[run_id] = (f"tool:{name}", time.perf_counter())
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def _finish(self, run_id):
+        started = self.starts.pop(run_id, None)
+        if started is not None:
+            name, start = started
+            self.durations[name].append(time.perf_counter() - start)
+
+    def reset(self):
+        self.starts.clear()
+        self.durations.clear()
+
+
+async def checkpoint_footprint() -> dict:
+    stats = await agent_graph.checkpoint_store.stats()
+    if args.checkpointer == "sqlite":
+        path = os.environ["CHECKPOINTER_URL"]
+        stats["bytes"] = sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+    else:
+        # Channel values (the message lists) are kept in blobs, not in storage.
+        saver = agent_graph.checkpoint_store.saver
+        stats["bytes"] = sum_bytes(saver.storage) + sum_bytes(saver.writes) + sum_bytes(saver.blobs)
+    return stats
+
+
+def sum_bytes(value) -> int:
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(sum_bytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(sum_bytes(v) for v in value)
+    return 0
+
+
+async def graph_turn(session_id : str, query : str):
+    config = {"configurable" : {"thread_id" : session_id, "api_key" : "fake"}}
+    await agent_graph.graph.ainvoke({"messages" : [HumanMessage(content=query)]}, config)
+
+
+def api_turn(client : httpx.AsyncClient):
+    async def turn(session_id : str, query : str):
+        response = await client.post("/chat", json={"query" : query, "session_id" : session_id}, headers={"api-key" : "fake"})
+        response.raise_for_status()
+    return turn
+
+
+async def run(turn, concurrency : int, turns : int, sessions : int) -> tuple[list[float], int, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def session(index : int):
+        nonlocal failures
+        async with semaphore:
+            session_id = str(uuid.uuid4())
+            for t in range(turns):
+                start = time.perf_counter()
+                try:
+                    await turn(session_id, QUERIES[(index + t) % len(QUERIES)])
+                    latencies.append(time.perf_counter() - start)
+                except Exception as e:
+                    failures += 1
+                    print(f"  turn failed: {e!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return latencies, failures, time.perf_counter() - start
+
+
+def report(target : str, concurrency : int, turns : int, latencies : list[float], failures : int,
+           elapsed : float, timer : NodeTimer, before : dict, after : dict, heap_growth : int):
+    print(
+        f"\n[{target}] concurrency={concurrency} turns/session={turns} turns={len(latencies)} failures={failures} "
+        f"throughput={len(latencies) / elapsed:.2f} turns/s"
+    )
+    print(
+        f"  end-to-end  p50={percentile(latencies, 0.5) * 1000:8.1f}ms  p95={percentile(latencies, 0.95) * 1000:8.1f}ms  "
+        f"p99={percentile(latencies, 0.99) * 1000:8.1f}ms"
+    )
+    for name, durations in sorted(timer.durations.items()):
+        print(
+            f"  {name:<28} n={len(durations):<5} mean={statistics.fmean(durations) * 1000:8.1f}ms  "
+            f"p50={percentile(durations, 0.5) * 1000:8.1f}ms  p95={percentile(durations, 0.95) * 1000:8.1f}ms  "
+            f"p99={percentile(durations, 0.99) * 1000:8.1f}ms"
+        )
+    print(
+        f"  checkpointer sessions {before['sessions']} -> {after['sessions']}, "
+        f"checkpoints {before['checkpoints']} -> {after['checkpoints']}, "
+        f"bytes {before['bytes']} -> {after['bytes']} (+{after['bytes'] - before['bytes']}), "
+        f"heap +{heap_growth / 1024:.0f} KiB"
+    )
+
+
+async def bench(target : str, turn, timer : NodeTimer):
+    for turns in args.turns:
+        for concurrency in args.levels:
+            sessions = args.sessions or concurrency * 2
+            timer.reset()
+            before = await checkpoint_footprint()
+            heap_before = tracemalloc.get_traced_memory()[0]
+            latencies, failures, elapsed = await run(turn, concurrency, turns, sessions)
+            heap_growth = tracemalloc.get_traced_memory()[0] - heap_before
+            after = await checkpoint_footprint()
+            report(target, concurrency, turns, latencies, failures, elapsed, timer, before, after, heap_growth)
+
+
+async def main():
+    timer = NodeTimer()
+    # Pregel merges graph.config into every run, so API requests are timed too.
+    config = agent_graph.graph.config or {}
+    agent_graph.graph.config = {**config, "callbacks" : list(config.get("callbacks") or []) + [timer]}
+    tracemalloc.start()
+    print(f"graph_mode={args.graph_mode} checkpointer={args.checkpointer} latencies={fakes.LATENCIES} workdir={workdir}")
+
+    if args.target in ("graph", "both"):
+        await agent_graph.open_checkpointer()
+        await bench("graph", graph_turn, timer)
+        await agent_graph.checkpoint_store.close()
+
+    if args.target in ("api", "both"):
+        import main as api
+
+        # httpx's ASGI transport skips lifespan events, so run them here.
+        async with api.app.router.lifespan_context(api.app):
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=300) as client:
+                await bench("api", api_turn(client), timer)
+
+    print(f"\nllm_pool={agent_graph.llm_pool.stats()}")
+    print(f"web_search={agent_graph.web_search.stats()}")
+    print(f"embeddings={agent_graph.embeddings.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
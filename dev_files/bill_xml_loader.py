@@ -0,0 +1,133 @@
+"""Streaming loader for legislative bill XML with section-aligned chunks
+
+Parses GPO bill XML (`<legis-body><section><enum><header>...`) and USLM
+(`<section><num><heading>...`) with `iterparse`, emitting one chunk per
+top-level section as soon as its end tag is read and clearing it afterwards,
+so whole files are never held as a tree. Oversized sections are split on
+subsection boundaries and only fall back to character splitting when a single
+subsection is still too long.
+"""
+import os
+import xml.etree.ElementTree as ET
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+SECTION_TAGS = {"section"}
+SUBSECTION_TAGS = {"subsection"}
+NUMBER_TAGS = {"enum", "num"}
+HEADER_TAGS = {"header", "heading"}
+TITLE_TAGS = {"official-title", "officialTitle", "docTitle"}
+DUBLIN_CORE_NS = "purl.org/dc"
+BILL_NUMBER_TAGS = {"legis-num", "docNumber"}
+CONGRESS_TAGS = {"congress"}
+
+
+def local_name(tag : str) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def clean_text(parts) -> str:
+    return " ".join(" ".join(parts).split())
+
+
+def child_text(elem, tags : set[str]) -> str:
+    for child in elem:
+        if local_name(child.tag) in tags:
+            return clean_text(child.itertext())
+    return ""
+
+
+class BillXMLLoader:
+    def __init__(self, path : str, max_chars : int = 2000, chunk_overlap : int = 200):
+        self.path = path
+        self.max_chars = max_chars
+        self.fallback_splitter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=chunk_overlap)
+
+    def _section_units(self, section) -> list[str]:
+        """Lead text followed by one unit per subsection; number and header go in the prefix."""
+        lead, units = [], []
+        for child in section:
+            name = local_name(child.tag)
+            if name in SUBSECTION_TAGS:
+                units.append(clean_text(child.itertext()))
+            elif name not in NUMBER_TAGS and name not in HEADER_TAGS:
+                lead.append(clean_text(child.itertext()))
+        if section.text and section.text.strip():
+            lead.insert(0, section.text.strip())
+        return [unit for unit in [" ".join(lead)] + units if unit]
+
+    def _group_units(self, units : list[str], budget : int) -> list[str]:
+        chunks, current = [], ""
+        for unit in units:
+            pieces = [unit] if len(unit) <= budget else self.fallback_splitter.split_text(unit)
+            for piece in pieces:
+                if current and len(current) + 1 + len(piece) > budget:
+                    chunks.append(current)
+                    current = ""
+                current = f"{current}\n{piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def lazy_load(self):
+        bill = {"bill_id" : "", "title" : "", "congress" : ""}
+        depth = 0
+        found_section = False
+
+        for event, elem in ET.iterparse(self.path, events=("start", "end")):
+            name = local_name(elem.tag)
+            if event == "start":
+                if name in SECTION_TAGS:
+                    depth += 1
+                continue
+
+            if depth == 0:
+                if name in BILL_NUMBER_TAGS and not bill["bill_id"]:
+                    bill["bill_id"] = clean_text(elem.itertext())
+                elif name in CONGRESS_TAGS and not bill["congress"]:
+                    bill["congress"] = clean_text(elem.itertext())
+                elif (name in TITLE_TAGS or (name == "title" and DUBLIN_CORE_NS in elem.tag)) and not bill["title"]:
+                    bill["title"] = clean_text(elem.itertext())
+
+            if name not in SECTION_TAGS:
+                continue
+            depth -= 1
+            if depth:
+                # Nested sections (e.g. inside quoted amendments) stay part of the outer one.
+                continue
+
+            found_section = True
+            yield from self._section_documents(elem, bill)
+            elem.clear()
+
+        if not found_section:
+            # Not a sectioned bill; fall back to splitting the whole text.
+            root_text = clean_text(ET.parse(self.path).getroot().itertext())
+            for part, chunk in enumerate(self.fallback_splitter.split_text(root_text)):
+                yield Document(page_content=chunk, metadata=self._metadata(bill, "", "", part))
+
+    def _metadata(self, bill : dict, number : str, header : str, part : int) -> dict:
+        bill_id = bill["bill_id"] or os.path.splitext(os.path.basename(self.path))[0]
+        if bill["congress"] and bill["congress"] not in bill_id:
+            bill_id = f"{bill['congress']} {bill_id}"
+        return {
+            "source" : self.path,
+            "bill_id" : bill_id,
+            "title" : bill["title"],
+            "section" : number,
+            "section_header" : header,
+            "part" : part,
+        }
+
+    def _section_documents(self, section, bill : dict):
+        number = child_text(section, NUMBER_TAGS).rstrip(".")
+        header = child_text(section, HEADER_TAGS)
+        metadata = self._metadata(bill, number, header, 0)
+        # A short citation line keeps each chunk self-describing for retrieval.
+        prefix = f"{metadata['bill_id']} Sec. {number}. {header}".strip() + "\n"
+        for part, chunk in enumerate(self._group_units(self._section_units(section), self.max_chars - len(prefix))):
+            yield Document(page_content=prefix + chunk, metadata={**metadata, "part" : part})
+
+    def load(self) -> list[Document]:
+        return list(self.lazy_load())
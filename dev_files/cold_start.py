@@ -0,0 +1,89 @@
+"""Measures API import time and time-to-ready of a fresh server process.
+
+    python dev_files/cold_start.py [--runs 5] [--fake]
+
+For each run a new interpreter imports app/main.py (import time), then a new
+uvicorn process is started and /ready is polled: "listening" is the first
+HTTP response of any status, "ready" the first 200. That second number is the
+scale-out latency a new container adds before it can take traffic. --fake
+builds the offline clients from dev_files/fakes.py instead of Cosmos, Gemini
+and Tavily, which isolates the app's own start-up cost.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(HERE, '..', 'app'))
+
+parser = argparse.ArgumentParser(description="Measure import time and time-to-ready of the API")
+parser.add_argument("--runs", type=int, default=5)
+parser.add_argument("--fake", action="store_true", help="use the offline fakes instead of real backends")
+parser.add_argument("--timeout", type=float, default=120)
+args = parser.parse_args()
+
+PRELUDE = "import fakes; fakes.install(); " if args.fake else ""
+ENV = {**os.environ, "PYTHONPATH" : os.pathsep.join([HERE, APP_DIR, os.environ.get("PYTHONPATH", "")])}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", PRELUDE + "import main"], cwd=APP_DIR, env=ENV, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def measure_startup() -> tuple[float, float, dict]:
+    port = free_port()
+    code = PRELUDE + f"import uvicorn; uvicorn.run('main:app', port={port}, log_level='warning')"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", code], cwd=APP_DIR, env=ENV, stdout=subprocess.DEVNULL)
+    listening = None
+    try:
+        while time.perf_counter() - start < args.timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/ready", timeout=1)
+            except httpx.HTTPError:
+                time.sleep(0.05)
+                continue
+            listening = listening or time.perf_counter() - start
+            if response.status_code == 200:
+                return listening, time.perf_counter() - start, response.json()
+            time.sleep(0.05)
+        raise TimeoutError(f"server not ready after {args.timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summary(values : list[float]) -> str:
+    return f"median={statistics.median(values):6.2f}s  min={min(values):6.2f}s  max={max(values):6.2f}s"
+
+
+imports, listening, ready = [], [], []
+for run in range(args.runs):
+    imports.append(measure_import())
+    to_listen, to_ready, body = measure_startup()
+    listening.append(to_listen)
+    ready.append(to_ready)
+    slowest = max(body["resources"].items(), key=lambda item : item[1]["init_seconds"] or 0)
+    print(
+        f"run {run + 1}: import {imports[-1]:.2f}s  listening {to_listen:.2f}s  ready {to_ready:.2f}s  "
+        f"(slowest resource: {slowest[0]} {slowest[1]['init_seconds']}s)"
+    )
+
+print(f"\nimport     {summary(imports)}")
+print(f"listening  {summary(listening)}")
+print(f"ready      {summary(ready)}")
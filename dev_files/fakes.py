@@ -0,0 +1,224 @@
+"""Deterministic offline stand-ins for Gemini, Gemini embeddings, Cosmos and Tavily.
+
+`install(latencies)` must run before `langgraph_app` is imported: it replaces
+the client classes in their source modules, so the app builds the fakes at
+import time exactly where it would build the real clients.
+
+    FakeChatModel        ChatGoogleGenerativeAI (tool calls, intent labels, answers)
+    FakeEmbeddings       GoogleGenerativeAIEmbeddings (hashed bag of words, 768 dims)
+    FakeVectorSearch     AzureCosmosDBNoSqlVectorSearch (synthetic bill sections)
+    FakeTavilyClient     AsyncTavilyClient (langgraph_app.web_search)
+
+Every fake sleeps for its configured latency (seconds) so graph overhead can
+be measured against a realistic but repeatable backend.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+LATENCIES = {
+    "llm" : 0.4,
+    "llm_per_token" : 0.0,
+    "embedding" : 0.05,
+    "vector_search" : 0.1,
+    "web_search" : 0.5,
+}
+ANSWER_TOKENS = 150
+WEB_SEARCH_RATE = 0.2
+DIMENSIONS = 768
+
+POLICIES = [
+    ("H.R. 3590", "Patient Protection and Affordable Care Act"),
+    ("S. 1", "Clean Air Act Amendments"),
+    ("H.R. 1", "Family and Medical Leave Act"),
+    ("S. 933", "Americans with Disabilities Act"),
+    ("H.R. 3162", "USA PATRIOT Act"),
+    ("A.B. 375", "California Consumer Privacy Act"),
+]
+
+
+def stable_hash(text : str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+
+
+def last_user_line(prompt : str) -> str:
+    lines = [line for line in prompt.splitlines() if line.startswith("User: ")]
+    return lines[-1][len("User: "):].strip() if lines else prompt.strip()[-200:]
+
+
+def current_turn(prompt : str) -> str:
+    index = prompt.rfind("\nUser: ")
+    return prompt[index:] if index >= 0 else prompt
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers by prompt shape: intent prompts get a label, summary prompts a
+    short paragraph, and answer prompts first call context_retriever (unless
+    retrieval already happened this turn), sometimes web_search_tool, and
+    then answer with ANSWER_TOKENS words.
+    """
+
+    model : str = "fake-gemini"
+    temperature : float = 0
+    google_api_key : str | None = None
+    tool_names : list[str] = []
+    tool_choice : str | None = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def bind_tools(self, tools, tool_choice = None, **kwargs):
+        names = [getattr(t, "name", None) or getattr(t, "__name__", str(t)) for t in tools]
+        return self.model_copy(update={"tool_names" : names, "tool_choice" : tool_choice})
+
+    def _respond(self, prompt : str) -> AIMessage:
+        # Imported here: langgraph_app must only load after install().
+        from langgraph_app.intent_classifier import classify_by_rules
+
+        if "Execute Classification" in prompt:
+            intent, _ = classify_by_rules(prompt.rsplit("**Query:**", 1)[-1])
+            return AIMessage(content=intent or "general_qa")
+        if "Existing summary:" in prompt:
+            return AIMessage(content="The user asked about several U.S. policies and received cited answers. " * 3)
+
+        query = last_user_line(prompt)
+        turn = current_turn(prompt)
+        if "context_retriever" in self.tool_names and "Tool result (context_retriever)" not in turn:
+            return self._tool_call("context_retriever", {"query" : query})
+        wants_web = stable_hash(query) % 100 < WEB_SEARCH_RATE * 100
+        if wants_web and "web_search_tool" in self.tool_names and "Tool result (web_search_tool)" not in turn:
+            return self._tool_call("web_search_tool", {"query" : query})
+
+        answer = " ".join(f"word{i}" for i in range(ANSWER_TOKENS))
+        if "IntentAnswer" in self.tool_names:
+            intent, _ = classify_by_rules(query)
+            return self._tool_call("IntentAnswer", {"intent" : intent or "general_qa", "answer" : answer})
+        return AIMessage(content=answer)
+
+    def _tool_call(self, name : str, args : dict) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name" : name, "args" : args, "id" : str(uuid.uuid4())}])
+
+    def _result(self, messages) -> tuple[ChatResult, float]:
+        prompt = messages[-1].content if isinstance(messages[-1].content, str) else str(messages[-1].content)
+        message = self._respond(prompt)
+        input_tokens = len(prompt) // 4
+        output_tokens = max(len(str(message.content)) // 4, 1)
+        message.usage_metadata = {
+            "input_tokens" : input_tokens,
+            "output_tokens" : output_tokens,
+            "total_tokens" : input_tokens + output_tokens,
+        }
+        latency = LATENCIES["llm"] + LATENCIES["llm_per_token"] * output_tokens
+        return ChatResult(generations=[ChatGeneration(message=message)]), latency
+
+    def _generate(self, messages, stop = None, run_manager = None, **kwargs) -> ChatResult:
+        result, latency = self._result(messages)
+        time.sleep(latency)
+        return result
+
+    async def _agenerate(self, messages, stop = None, run_manager = None, **kwargs) -> ChatResult:
+        result, latency = self._result(messages)
+        await asyncio.sleep(latency)
+        return result
+
+
+class FakeEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors, so near-identical texts stay near each other."""
+
+    def __init__(self, model : str = "fake-embedding", **kwargs):
+        self.model = model
+
+    def _vector(self, text : str) -> list[float]:
+        vector = np.zeros(DIMENSIONS, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[stable_hash(word) % DIMENSIONS] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text : str) -> list[float]:
+        time.sleep(LATENCIES["embedding"])
+        return self._vector(text)
+
+    def embed_documents(self, texts : list[str]) -> list[list[float]]:
+        time.sleep(LATENCIES["embedding"])
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text : str) -> list[float]:
+        await asyncio.sleep(LATENCIES["embedding"])
+        return self._vector(text)
+
+    async def aembed_documents(self, texts : list[str]) -> list[list[float]]:
+        await asyncio.sleep(LATENCIES["embedding"])
+        return [self._vector(text) for text in texts]
+
+
+class FakeVectorSearch:
+    """Returns k synthetic bill sections chosen deterministically from the query."""
+
+    def __init__(self, embedding = None, **kwargs):
+        self.embedding = embedding
+
+    def similarity_search(self, query : str, k : int = 4, **kwargs) -> list[Document]:
+        if self.embedding is not None:
+            # Like the Cosmos store, every search embeds the query first, full-text ranking included.
+            self.embedding.embed_query(query)
+        time.sleep(LATENCIES["vector_search"])
+        seed = stable_hash(query)
+        documents = []
+        for rank in range(k):
+            bill_id, title = POLICIES[(seed + rank) % len(POLICIES)]
+            section = (seed >> 8) % 40 + rank + 1
+            sentences = [
+                f"Section {section} of the {title} sets out requirements relevant to {query}.",
+                f"Covered entities must comply within {section * 30} days of enactment.",
+                "The Secretary shall issue regulations and may assess civil penalties for violations.",
+                "Nothing in this section preempts a State law that provides greater protection.",
+            ] * 4
+            documents.append(Document(
+                page_content=" ".join(sentences),
+                metadata={"bill_id" : bill_id, "title" : title, "section" : str(section), "section_header" : "Requirements"},
+                id=f"{bill_id}-{section}",
+            ))
+        return documents
+
+
+class FakeCosmosClient:
+    def __init__(self, *args, **kwargs):
+        return
+
+
+def install(latencies : dict | None = None, answer_tokens : int = ANSWER_TOKENS, web_search_rate : float = WEB_SEARCH_RATE):
+    """Swaps the real clients for the fakes; call before importing langgraph_app."""
+    global ANSWER_TOKENS, WEB_SEARCH_RATE
+    LATENCIES.update(latencies or {})
+    ANSWER_TOKENS = answer_tokens
+    WEB_SEARCH_RATE = web_search_rate
+
+    import azure.cosmos
+    import langchain_google_genai
+    from langchain_community.vectorstores import azure_cosmos_db_no_sql
+
+    langchain_google_genai.ChatGoogleGenerativeAI = FakeChatModel
+    langchain_google_genai.GoogleGenerativeAIEmbeddings = FakeEmbeddings
+    azure.cosmos.CosmosClient = FakeCosmosClient
+    azure_cosmos_db_no_sql.AzureCosmosDBNoSqlVectorSearch = FakeVectorSearch
+
+    os.environ["WEB_SEARCH_BACKEND"] = "fake"
+    os.environ["FAKE_TAVILY_LATENCY"] = str(LATENCIES["web_search"])
+    os.environ["VECTOR_BACKEND"] = "cosmos"
+    os.environ.setdefault("GOOGLE_API_KEY", "fake")
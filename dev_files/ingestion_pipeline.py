@@ -1,7 +1,20 @@
 import os
+import sys
+import glob
+import json
+import shutil
+import hashlib
 import time
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredXMLLoader
+import random
+import threading
+import uuid
+from collections import Counter, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from langchain_community.document_loaders import UnstructuredXMLLoader
 from azure.cosmos import CosmosClient, PartitionKey
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from azure.cosmos.partition_key import NonePartitionKeyValue
 from langchain_community.vectorstores.azure_cosmos_db_no_sql import (
     AzureCosmosDBNoSqlVectorSearch,
 )
@@ -10,15 +23,36 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from tqdm import tqdm
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+from langgraph_app.vector_index import LocalIndexWriter, LocalVectorIndex, META_FILE
+from bill_xml_loader import BillXMLLoader
+
 load_dotenv()
 
+# VECTOR_BACKEND=local writes a LocalVectorIndex to LOCAL_INDEX_PATH instead of
+# uploading to Cosmos; LOCAL_INDEX_HNSW=true also builds the approximate graph.
+vector_backend = os.getenv("VECTOR_BACKEND", "cosmos")
+local_index_path = os.getenv("LOCAL_INDEX_PATH", "vector_index")
+build_hnsw = os.getenv("LOCAL_INDEX_HNSW", "false").lower() == "true"
+
+dataset_path = os.getenv("INGEST_DATASET", "test_dataset")
+batch_size = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+# Embedding + upsert workers; each one owns a single batch at a time.
+worker_count = int(os.getenv("INGEST_WORKERS", "8"))
+parse_workers = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 4)))
+max_retries = int(os.getenv("INGEST_MAX_RETRIES", "6"))
+
+# Incremental mode only embeds chunks whose content hash is not in the manifest
+# and deletes chunks that disappeared from edited or removed files.
+incremental = os.getenv("INGEST_INCREMENTAL", "true").lower() == "true"
+manifest_path = os.getenv("INGEST_MANIFEST", f"ingestion_manifest_{vector_backend}.json")
+
 cosmos_host = os.getenv("COSMOS_HOST")
 cosmos_key = os.getenv("COSMOS_KEY")
-if not cosmos_host or not cosmos_key:
+if vector_backend == "cosmos" and (not cosmos_host or not cosmos_key):
     raise ValueError("COSMOS_HOST and COSMOS_KEY must be set in your .env file.")
 
 embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-cosmos_client = CosmosClient(cosmos_host, cosmos_key)
 
 database_name = "vectordb"
 container_name = "embeddings"
@@ -43,68 +77,402 @@ indexing_policy = {
     "vectorIndexes": [{"path": "/embedding", "type": "diskANN"}],
 }
 
-print("Loading and splitting documents...")
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200)
-loader = DirectoryLoader(
-    path="test_dataset",
-    glob="**/*.xml",
-    loader_cls=UnstructuredXMLLoader,
-)
-docs = loader.load()
-print(f"Total documents found: {len(docs)}")
-
-all_splits = text_splitter.split_documents(docs)
-
-for split in all_splits:
-    if "userId" not in split.metadata:
-        split.metadata["userId"] = "default_user_1" # Assign a default partition key value
-
-print(f"All documents processed. Total chunks: {len(all_splits)}")
-
-print(" Initializing Azure Cosmos DB Vector Store...")
-vector_store = AzureCosmosDBNoSqlVectorSearch(
-    cosmos_client=cosmos_client,
-    embedding=embeddings,
-    database_name=database_name,
-    container_name=container_name,
-    vector_embedding_policy=vector_embedding_policy,
-    indexing_policy=indexing_policy,
-    cosmos_container_properties=cosmos_container_properties,
-    cosmos_database_properties={},
-)
+chunk_size = int(os.getenv("INGEST_CHUNK_SIZE", "2000"))
+chunk_overlap = 200
+# "bill" streams sections with BillXMLLoader, "unstructured" is the generic loader.
+xml_parser = os.getenv("INGEST_XML_PARSER", "bill")
+# Stored in the manifest; a different chunker re-chunks every file.
+chunker_version = f"{xml_parser}:{chunk_size}:{chunk_overlap}"
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+DEFAULT_USER_ID = "default_user_1"
+
+
+class Throttle:
+    """
+    Shared adaptive delay for all workers: every throttled call doubles it
+    (or jumps to the server's retry-after), every success shrinks it again.
+    """
+
+    def __init__(self, max_delay : float = 60.0):
+        self.delay = 0.0
+        self.max_delay = max_delay
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self.delay
+        if delay:
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def on_success(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > 0.05 else 0.0
+
+    def on_throttle(self, retry_after : float | None):
+        with self._lock:
+            self.throttled += 1
+            self.delay = min(self.max_delay, max(retry_after or 0.0, self.delay * 2 or 1.0))
+
+
+def is_throttled(error : Exception) -> bool:
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    message = str(error)
+    return status == 429 or "429" in message or "RESOURCE_EXHAUSTED" in message or "Request rate is large" in message
+
+
+def retry_after(error : Exception) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    value = headers.get("x-ms-retry-after-ms") if hasattr(headers, "get") else None
+    return float(value) / 1000 if value else None
+
+
+def file_hash(path : str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def assign_chunk_ids(splits):
+    """
+    Chunk id = sha256(source, text) (+ occurrence for repeated text), so an
+    unchanged chunk keeps its id across runs and doubles as its content hash.
+    """
+    seen = Counter()
+    for split in splits:
+        digest = hashlib.sha256(f"{split.metadata['source']}\x00{split.page_content}".encode()).hexdigest()
+        seen[digest] += 1
+        split.id = digest if seen[digest] == 1 else f"{digest}-{seen[digest]}"
+
+
+def load_file(path : str):
+    if xml_parser == "bill":
+        # Chunks already follow section/subsection boundaries.
+        splits = BillXMLLoader(path, max_chars=chunk_size, chunk_overlap=chunk_overlap).load()
+    else:
+        splits = text_splitter.split_documents(UnstructuredXMLLoader(path).load())
+    for split in splits:
+        if "userId" not in split.metadata:
+            split.metadata["userId"] = DEFAULT_USER_ID # Assign a default partition key value
+    assign_chunk_ids(splits)
+    return splits
+
+
+def iter_file_splits(paths : list[str]):
+    """
+    Yields (path, splits) in order while parsing in a process pool, keeping at
+    most 2 * parse_workers files in flight. splits is None if parsing failed.
+    """
+    path_iter = iter(paths)
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        pending = deque((path, pool.submit(load_file, path)) for path in islice(path_iter, 2 * parse_workers))
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(path_iter, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(load_file, next_path)))
+            try:
+                yield path, future.result()
+            except Exception as e:
+                print(f"\n Could not parse {path}: {e}")
+                yield path, None
+
+
+def load_manifest() -> dict:
+    """{"chunker": chunker_version, "files": {path: {"hash": sha256 of the file, "chunks": [chunk ids]}}}"""
+    if not incremental or not os.path.exists(manifest_path):
+        return {"chunker" : chunker_version, "files" : {}}
+    if vector_backend == "local" and not os.path.exists(os.path.join(local_index_path, META_FILE)):
+        print(" Local index is missing, ignoring the manifest and rebuilding.")
+        return {"chunker" : chunker_version, "files" : {}}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest : dict):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+_container = None
 
-print("\n Uploading chunks to Azure Cosmos DB in batches...")
-batch_size = 100
-failed_documents_to_retry = []
+def cosmos_container():
+    global _container
+    if _container is None:
+        print(" Initializing Azure Cosmos DB Vector Store...")
+        cosmos_client = CosmosClient(cosmos_host, cosmos_key)
+        # Constructing the store creates the database/container with the vector policies.
+        AzureCosmosDBNoSqlVectorSearch(
+            cosmos_client=cosmos_client,
+            embedding=embeddings,
+            database_name=database_name,
+            container_name=container_name,
+            vector_embedding_policy=vector_embedding_policy,
+            indexing_policy=indexing_policy,
+            cosmos_container_properties=cosmos_container_properties,
+            cosmos_database_properties={},
+        )
+        _container = cosmos_client.get_database_client(database_name).get_container_client(container_name)
+    return _container
 
-for i in tqdm(range(0, len(all_splits), batch_size), desc="Uploading Batches"):
-    batch = all_splits[i:i + batch_size]
 
-    try:
-        vector_store.add_documents(batch)
+def cosmos_upsert(batch, vectors):
+    # Same item shape AzureCosmosDBNoSqlVectorSearch writes and reads back.
+    container = cosmos_container()
+    for doc, vector in zip(batch, vectors):
+        container.upsert_item({
+            "id" : doc.id or str(uuid.uuid4()),
+            "userId" : doc.metadata["userId"],
+            "text" : doc.page_content,
+            "embedding" : vector,
+            "metadata" : doc.metadata,
+        })
 
-    except Exception as e:
-        batch_number = i // batch_size + 1
-        print(f"\n Error processing batch {batch_number}: {e}")
 
-        failed_documents_to_retry.extend(batch)
+def cosmos_delete(chunk_ids, partition_key = DEFAULT_USER_ID):
+    container = cosmos_container()
+
+    def delete(chunk_id):
+        try:
+            container.delete_item(item=chunk_id, partition_key=partition_key)
+        except CosmosResourceNotFoundError:
+            pass
+
+    with ThreadPoolExecutor(max_workers=worker_count) as pool:
+        list(pool.map(delete, chunk_ids))
+
+
+def cosmos_purge_legacy():
+    """
+    Chunks written before the manifest existed (langchain's add_documents) have
+    random ids and no top-level userId, so no run would ever replace or delete
+    them and every chunk would be stored twice. They live under the undefined
+    partition key value and are removed once, on the first run without a manifest.
+    """
+    container = cosmos_container()
+    legacy_ids = [
+        item["id"]
+        for item in container.query_items(
+            "SELECT c.id FROM c WHERE NOT IS_DEFINED(c.userId)", enable_cross_partition_query=True
+        )
+    ]
+    if legacy_ids:
+        print(f" Deleting {len(legacy_ids)} chunks written by the pre-manifest pipeline...")
+        cosmos_delete(legacy_ids, partition_key=NonePartitionKeyValue)
+
+
+def open_local_writer():
+    """
+    The local index is append-only, so each run writes a fresh copy next to
+    the old one: new chunks are appended first, kept rows are then copied with
+    their stored vectors (no re-embedding) and the directories are swapped.
+    """
+    tmp_path = local_index_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    return LocalIndexWriter(tmp_path, dimensions=768)
+
+
+def carry_over_local_rows(local_writer : LocalIndexWriter, keep_ids : set[str]):
+    if not keep_ids or not os.path.exists(os.path.join(local_index_path, META_FILE)):
+        return
+    old_index = LocalVectorIndex(local_index_path, embedding=None)
+    carried = 0
+    for docs, vectors in old_index.iter_rows(batch_size=1000):
+        kept = [i for i, doc in enumerate(docs) if doc.id in keep_ids]
+        if kept:
+            local_writer.add([docs[i] for i in kept], vectors[kept])
+            carried += len(kept)
+    old_index.close()
+    print(f" Carried over {carried} unchanged chunks from the existing local index.")
+
+
+def finish_local_writer(local_writer : LocalIndexWriter):
+    local_writer.close(build_hnsw=build_hnsw)
+    old_path = local_index_path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(local_index_path):
+        os.rename(local_index_path, old_path)
+    os.rename(local_writer.path, local_index_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    print(f" Local index written: {local_writer.count} chunks in {local_index_path}")
+
+
+def process_batch(batch, write, throttle : Throttle):
+    """Embeds and stores one batch, retrying with backoff. Returns None or the last error."""
+    for attempt in range(max_retries + 1):
+        throttle.wait()
+        try:
+            vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+            write(batch, vectors)
+            throttle.on_success()
+            return None
+        except Exception as e:
+            if attempt == max_retries:
+                return e
+            if is_throttled(e):
+                # The shared delay is applied by throttle.wait() on the next attempt.
+                throttle.on_throttle(retry_after(e))
+            else:
+                time.sleep(min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0))
+
+
+def run_batches(batches, write, total_chunks : int | None = None):
+    """
+    Keeps at most 2 * worker_count batches in flight so memory stays bounded
+    even when `batches` is a generator.
+    """
+    throttle = Throttle()
+    failed = []
+    done_chunks = 0
+    start = time.perf_counter()
+    progress = tqdm(total=total_chunks, desc="Embedding + upload", unit="chunk")
+
+    def collect(finished):
+        nonlocal done_chunks
+        for future in finished:
+            batch = in_flight.pop(future)
+            error = future.result()
+            if error is not None:
+                print(f"\n Error processing batch of {len(batch)} chunks after {max_retries} retries: {error}")
+                failed.extend(batch)
+            done_chunks += len(batch)
+            progress.update(len(batch))
+            progress.set_postfix(chunks_per_s=f"{done_chunks / (time.perf_counter() - start):.1f}", throttled=throttle.throttled)
+
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=worker_count) as pool:
+        for batch in batches:
+            if len(in_flight) >= 2 * worker_count:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+            in_flight[pool.submit(process_batch, batch, write, throttle)] = batch
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(finished)
+    progress.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n Processed {done_chunks} chunks in {elapsed:.1f}s ({done_chunks / max(elapsed, 1e-9):.1f} chunks/s, "
+          f"{worker_count} workers, {throttle.throttled} throttled calls)")
+    return failed
+
+
+def batched(items, size):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def main():
+    print("Loading and splitting documents...")
+    paths = sorted(glob.glob(os.path.join(dataset_path, "**", "*.xml"), recursive=True))
+    print(f"Total documents found: {len(paths)}")
+
+    manifest = load_manifest()
+    old_files = manifest["files"]
+    # Nothing in the container is tracked yet, so chunks from older pipelines may be there.
+    untracked_store = not old_files
+    hashes = {path : file_hash(path) for path in paths}
+    if manifest.get("chunker") != chunker_version:
+        # Chunk ids depend on the chunker, so every file is re-chunked and the
+        # previous chunks become stale.
+        print(f" Chunker changed ({manifest.get('chunker')} -> {chunker_version}), re-chunking all files.")
+        changed = list(paths)
+        manifest["chunker"] = chunker_version
+    else:
+        changed = [path for path in paths if old_files.get(path, {}).get("hash") != hashes[path]]
+    removed = [path for path in old_files if path not in hashes]
+    print(f"{len(changed)} new or changed files, {len(paths) - len(changed)} unchanged, {len(removed)} removed")
+
+    old_ids = {path : set(old_files.get(path, {}).get("chunks", [])) for path in changed + removed}
+    # Only chunk ids are kept per file; documents flow straight from the parser
+    # to the upload workers in batches, so memory is O(batch), not O(corpus).
+    new_ids = {}
+    parse_failed = set()
+    # Chunk totals are unknown until every file is parsed, so ETA is per file.
+    files_progress = tqdm(total=len(changed), desc="Files", unit="file")
+
+    def new_chunks():
+        for path, splits in iter_file_splits(changed):
+            files_progress.update(1)
+            if splits is None:
+                parse_failed.add(path)
+                continue
+            new_ids[path] = [split.id for split in splits]
+            for split in splits:
+                if split.id not in old_ids[path]:
+                    yield split
+
+    if vector_backend == "local":
+        local_writer = open_local_writer()
+        write = local_writer.add
+    else:
+        local_writer = None
+        write = cosmos_upsert
+
+    print("\n Uploading chunks in batches...")
+    failed_documents_to_retry = run_batches(batched(new_chunks(), batch_size), write)
+    files_progress.close()
+    failed_sources = set(doc.metadata.get("source") for doc in failed_documents_to_retry) | parse_failed
+
+    print("\n All chunks processed.")
+
+    stale = {
+        path : old_ids[path] - set(new_ids.get(path, []))
+        for path in changed + removed
+        if path not in parse_failed
+    }
+
+    if local_writer is not None:
+        keep_ids = {
+            chunk_id
+            for path in paths
+            for chunk_id in (new_ids[path] if path in new_ids else old_files.get(path, {}).get("chunks", []))
+        }
+        carry_over_local_rows(local_writer, keep_ids)
+        finish_local_writer(local_writer)
+    else:
+        # Stale chunks are only removed once the file's new chunks are stored.
+        stale_ids = [chunk_id for path, ids in stale.items() if path not in failed_sources for chunk_id in ids]
+        if stale_ids:
+            print(f" Deleting {len(stale_ids)} stale chunks...")
+            cosmos_delete(stale_ids)
+        # After the upload, so the container is never empty while it runs.
+        if untracked_store:
+            cosmos_purge_legacy()
 
-        time.sleep(2)
+    failed_ids = set(doc.id for doc in failed_documents_to_retry)
+    for path in changed:
+        if path in parse_failed:
+            continue
+        if path not in failed_sources:
+            old_files[path] = {"hash" : hashes[path], "chunks" : new_ids.get(path, [])}
+        else:
+            # No hash, so the file is re-checked next run; listing what is stored
+            # means only the failed chunks are embedded again.
+            stored = old_ids[path] | (set(new_ids[path]) - failed_ids)
+            old_files[path] = {"hash" : None, "chunks" : sorted(stored)}
+    for path in removed:
+        old_files.pop(path, None)
+    save_manifest(manifest)
 
-print("\n All chunks processed.")
+    if failed_sources:
+        print(f"\n Warning: {len(failed_documents_to_retry)} document chunks failed to upload, "
+              f"{len(parse_failed)} files failed to parse.")
 
-if failed_documents_to_retry:
-    print(f"\n Warning: {len(failed_documents_to_retry)} document chunks failed to upload.")
+        output_filename = "failed_files.txt"
+        try:
+            with open(output_filename, "w") as f:
+                for filename in sorted(failed_sources):
+                    f.write(f"{filename}\n")
+            print(f"\n A list of files that had upload errors has been saved to: {output_filename}")
+            print(" They are retried on the next run.")
+        except IOError as e:
+            print(f"\n Could not write to file {output_filename}: {e}")
+    else:
+        print("\n All documents were ingested successfully!")
 
-    failed_files = set(doc.metadata.get('source', 'Unknown Source') for doc in failed_documents_to_retry)
 
-    output_filename = "failed_files.txt"
-    try:
-        with open(output_filename, "w") as f:
-            for filename in sorted(list(failed_files)):
-                f.write(f"{filename}\n")
-        print(f"\n A list of files that had upload errors has been saved to: {output_filename}")
-    except IOError as e:
-        print(f"\n Could not write to file {output_filename}: {e}")
-else:
-    print("\n All documents were ingested successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
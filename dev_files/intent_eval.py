@@ -0,0 +1,52 @@
+"""Reports hit-rate and accuracy of the local intent classifier.
+
+    python dev_files/intent_eval.py [--dataset dev_files/intent_queries.jsonl] [--threshold 0.8]
+
+Hit-rate is the share of queries resolved locally (no Gemini call); accuracy is
+measured on those hits only, since misses are answered by the LLM. Queries
+marked "split": "held_out" are worded independently of INTENT_EXAMPLES and the
+prompt's examples and are also reported on their own.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+from langgraph_app.intent_classifier import build_intent_classifier
+
+parser = argparse.ArgumentParser(description="Evaluate the local intent classifier")
+parser.add_argument("--dataset", default=os.path.join(os.path.dirname(__file__), "intent_queries.jsonl"))
+parser.add_argument("--threshold", type=float, default=0.8)
+parser.add_argument("--centroid-model", default=os.getenv("INTENT_CENTROID_MODEL"))
+args = parser.parse_args()
+
+with open(args.dataset) as f:
+    examples = [json.loads(line) for line in f if line.strip()]
+
+classifier = build_intent_classifier(args.threshold, args.centroid_model)
+
+totals = {}
+elapsed = 0.0
+for example in examples:
+    start = time.perf_counter()
+    intent, confidence, source = classifier.classify(example["query"])
+    elapsed += time.perf_counter() - start
+    for split in ("all", example.get("split", "seed")):
+        counts = totals.setdefault(split, {"queries" : 0, "hits" : 0, "correct" : 0})
+        counts["queries"] += 1
+        counts["hits"] += intent is not None
+        counts["correct"] += intent == example["intent"]
+    if intent is None:
+        print(f"  fallback   ({confidence:.2f})  {example['query']}")
+    elif intent != example["intent"]:
+        print(f"  WRONG {intent} != {example['intent']} ({source}, {confidence:.2f})  {example['query']}")
+
+for split, counts in totals.items():
+    hits = counts["hits"]
+    print(f"\n[{split}] queries       : {counts['queries']}")
+    print(f"[{split}] local hit-rate: {hits / counts['queries']:.1%}")
+    print(f"[{split}] accuracy@hits : {counts['correct'] / hits:.1%}" if hits else f"[{split}] accuracy@hits : n/a")
+print(f"\nmean latency  : {elapsed / len(examples) * 1e6:.1f} us")
@@ -0,0 +1,80 @@
+"""Concurrency load test for the /chat endpoint.
+
+Start the API first (e.g. `uvicorn main:app --workers 1` from app/) and run:
+
+    python dev_files/load_test.py --url http://127.0.0.1:8000 --levels 1 5 10 25 50
+
+Every request uses its own session_id so turns do not serialize on a thread's
+checkpoint. Throughput should grow with concurrency while the API is awaiting
+Gemini / Tavily / Cosmos instead of blocking the event loop.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+QUERIES = [
+    "What is the penalty for violating the Clean Air Act?",
+    "Explain the Family and Medical Leave Act in simple terms.",
+    "Compare the CCPA and GDPR.",
+    "List all the agencies mentioned in the Patriot Act.",
+    "When was the Americans with Disabilities Act enacted?",
+]
+
+
+async def send_chat(client, url, api_key, i):
+    payload = {"query": QUERIES[i % len(QUERIES)], "session_id": str(uuid.uuid4())}
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/chat", json=payload, headers={"api-key": api_key})
+        ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+async def run_level(url, api_key, concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(timeout=300) as client:
+        async def bounded(i):
+            async with semaphore:
+                return await send_chat(client, url, api_key, i)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bounded(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    failures = sum(1 for ok, _ in results if not ok)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else float("nan")
+    p50 = statistics.median(latencies) if latencies else float("nan")
+    print(
+        f"concurrency={concurrency:<4} requests={total:<5} failures={failures:<4} "
+        f"throughput={len(latencies) / elapsed:6.2f} req/s  p50={p50:6.2f}s  p95={p95:6.2f}s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the /chat endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--requests-per-level", type=int, default=None,
+                        help="defaults to 2x the concurrency level")
+    args = parser.parse_args()
+
+    api_key = os.getenv("GOOGLE_API_KEY", "")
+    for level in args.levels:
+        total = args.requests_per_level or level * 2
+        await run_level(args.url, api_key, level, total)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
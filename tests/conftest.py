@@ -0,0 +1,5 @@
+"""Tests import the app package the same way main.py does: from app/."""
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app")))
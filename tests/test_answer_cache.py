@@ -0,0 +1,107 @@
+import asyncio
+
+import numpy as np
+
+from langgraph_app import answer_cache
+from langgraph_app.answer_cache import InMemoryAnswerCacheBackend, SemanticAnswerCache
+
+
+class FixedEmbeddings:
+    """Returns a preset vector per normalized query, so similarities are exact."""
+
+    def __init__(self, vectors : dict[str, list[float]]):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def aembed_query(self, text : str) -> list[float]:
+        self.calls += 1
+        return self.vectors[text]
+
+
+VECTORS = {
+    "what is the clean air act" : [1.0, 0.0, 0.0],
+    "what's the clean air act" : [0.99, 0.1, 0.0],      # cosine ~0.995
+    "what is the clean water act" : [0.8, 0.6, 0.0],    # cosine 0.8
+    "explain the clean air act" : [0.0, 0.0, 1.0],
+}
+
+
+def make_cache(**kwargs) -> SemanticAnswerCache:
+    return SemanticAnswerCache(FixedEmbeddings(VECTORS), **kwargs)
+
+
+def store(cache : SemanticAnswerCache, query : str, intent : str, response : str):
+    _, vector = asyncio.run(cache.lookup(query, intent))
+    cache.store(query, intent, vector, response)
+
+
+def test_similar_query_above_threshold_hits():
+    cache = make_cache(threshold=0.95)
+    store(cache, "What is the Clean Air Act?", "general_qa", "answer")
+
+    response, _ = asyncio.run(cache.lookup("What's the Clean Air Act", "general_qa"))
+
+    assert response == "answer"
+    assert cache.stats()["hits"] == 1
+
+
+def test_dissimilar_query_below_threshold_misses():
+    cache = make_cache(threshold=0.95)
+    store(cache, "What is the Clean Air Act?", "general_qa", "answer")
+
+    response, vector = asyncio.run(cache.lookup("What is the Clean Water Act?", "general_qa"))
+
+    assert response is None
+    assert vector is not None
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_are_keyed_by_intent():
+    cache = make_cache(threshold=0.95)
+    store(cache, "What is the Clean Air Act?", "general_qa", "answer")
+
+    response, _ = asyncio.run(cache.lookup("What is the Clean Air Act?", "eli5"))
+
+    assert response is None
+
+
+def test_exact_match_intents_ignore_similar_queries():
+    cache = make_cache(threshold=0.95)
+    store(cache, "What is the Clean Air Act?", "extract_entities", "[]")
+
+    assert asyncio.run(cache.lookup("What's the Clean Air Act", "extract_entities"))[0] is None
+    assert asyncio.run(cache.lookup("what is the clean air act", "extract_entities"))[0] == "[]"
+
+
+def test_expired_entries_miss_and_are_removed(monkeypatch):
+    cache = make_cache(threshold=0.95, ttl=60)
+    stored_at = answer_cache.time.monotonic()
+    store(cache, "What is the Clean Air Act?", "general_qa", "answer")
+
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda : stored_at + 59)
+    assert asyncio.run(cache.lookup("What is the Clean Air Act?", "general_qa"))[0] == "answer"
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda : stored_at + 61)
+    assert asyncio.run(cache.lookup("What is the Clean Air Act?", "general_qa"))[0] is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_backend_evicts_least_recently_used():
+    cache = make_cache(threshold=0.95, backend=InMemoryAnswerCacheBackend(max_entries=2))
+    store(cache, "What is the Clean Air Act?", "general_qa", "air")
+    store(cache, "Explain the Clean Air Act", "eli5", "eli5 air")
+    # A hit refreshes the first entry, so the eli5 one is now the oldest.
+    assert asyncio.run(cache.lookup("What is the Clean Air Act?", "general_qa"))[0] == "air"
+    store(cache, "What is the Clean Water Act?", "general_qa", "water")
+
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert asyncio.run(cache.lookup("Explain the Clean Air Act", "eli5"))[0] is None
+    assert asyncio.run(cache.lookup("What is the Clean Air Act?", "general_qa"))[0] == "air"
+
+
+def test_empty_responses_are_not_stored():
+    cache = make_cache()
+    cache.store("What is the Clean Air Act?", "general_qa", np.ones(3, dtype=np.float32), "")
+
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,28 @@
+from uuid import uuid4
+
+from langgraph_app.metrics import GraphInstrumentation, turns_total
+
+
+def completed_turns() -> float:
+    return turns_total._values[(("status", "ok"),)]
+
+
+def run_root(instrumentation : GraphInstrumentation, name : str):
+    run_id = uuid4()
+    instrumentation.on_chain_start({}, {}, run_id=run_id, metadata={"thread_id" : "s1"}, name=name)
+    instrumentation.on_chain_end({}, run_id=run_id)
+
+
+def test_graph_invocations_are_counted_as_turns():
+    instrumentation = GraphInstrumentation()
+    before = completed_turns()
+    run_root(instrumentation, "LangGraph")
+    assert completed_turns() == before + 1
+
+
+def test_update_state_writes_are_not_turns():
+    instrumentation = GraphInstrumentation()
+    before = completed_turns()
+    run_root(instrumentation, "LangGraphUpdateState")
+    assert completed_turns() == before
+    assert instrumentation._turns == {}
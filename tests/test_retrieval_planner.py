@@ -0,0 +1,63 @@
+import pytest
+
+from langgraph_app.retrieval_planner import plan_subqueries
+
+DECOMPOSED = [
+    ("CCPA vs GDPR", ["CCPA", "GDPR"]),
+    ("CCPA vs GDPR on data retention", ["CCPA data retention", "GDPR data retention"]),
+    ("What's the difference between Medicare and Medicaid?", ["Medicare", "Medicaid"]),
+    ("Compare the Clean Air Act and the Clean Water Act", ["Clean Air Act", "Clean Water Act"]),
+    ("Compare CCPA, GDPR and HIPAA", ["CCPA", "GDPR", "HIPAA"]),
+    ("Tell me the similarities between FMLA and ADA.", ["FMLA", "ADA"]),
+    ("Contrast Title VII with the ADEA", ["Title VII", "ADEA"]),
+    ("compare ccpa and gdpr", ["ccpa", "gdpr"]),
+    (
+        "How is the California Consumer Privacy Act (CCPA) different from Europe's GDPR?",
+        ["California Consumer Privacy Act (CCPA)", "Europe's GDPR"],
+    ),
+    (
+        "How does HIPAA compare to FERPA on student records?",
+        ["HIPAA student records", "FERPA student records"],
+    ),
+    (
+        "compare the Dodd-Frank Act and Sarbanes-Oxley with respect to whistleblowers",
+        ["Dodd-Frank Act whistleblowers", "Sarbanes-Oxley whistleblowers"],
+    ),
+    ("Compare the Food, Drug, and Cosmetic Act with HIPAA", ["Food, Drug, and Cosmetic Act", "HIPAA"]),
+    (
+        "Compare the Tax Cuts and Jobs Act with the Inflation Reduction Act",
+        ["Tax Cuts and Jobs Act", "Inflation Reduction Act"],
+    ),
+    ("How do GDPR and CCPA relate to each other?", ["GDPR", "CCPA"]),
+    ("How do HIPAA and FERPA interact with one another", ["HIPAA", "FERPA"]),
+    ("Compare Medicare Part A to Part B", ["Medicare Part A", "Medicare Part B"]),
+    ("Compare Part A and Part B of Medicare", ["Part A of Medicare", "Part B of Medicare"]),
+    ("Compare Title I and Title II of the ADA", ["Title I of the ADA", "Title II of the ADA"]),
+]
+
+NOT_DECOMPOSED = [
+    "What is the penalty for violating the Clean Air Act?",
+    "Compare the rules for tenants and landlords under the Fair Housing Act",
+    "Compare the rights of tenants and landlords under the Housing Act",
+    "compare Part A to Part B",
+    "What are the key differences in how CCPA and GDPR handle consent?",
+    "Compare the Clean Air Act",
+]
+
+
+@pytest.mark.parametrize("query, expected", DECOMPOSED)
+def test_comparisons_split_into_one_subquery_per_policy(query, expected):
+    assert plan_subqueries(query) == expected
+
+
+@pytest.mark.parametrize("query", NOT_DECOMPOSED)
+def test_other_queries_are_kept_whole(query):
+    assert plan_subqueries(query) == [query]
+
+
+def test_subqueries_are_capped():
+    assert plan_subqueries("Compare CCPA, GDPR, HIPAA, FERPA and COPPA", max_subqueries=3) == ["CCPA", "GDPR", "HIPAA"]
+
+
+def test_duplicate_items_are_dropped():
+    assert plan_subqueries("Compare GDPR, CCPA and GDPR") == ["GDPR", "CCPA"]
@@ -0,0 +1,81 @@
+import asyncio
+
+from langgraph_app import web_search
+from langgraph_app.web_search import CachedWebSearch, FakeTavilyClient
+
+
+def test_concurrent_identical_queries_share_one_call():
+    client = FakeTavilyClient(latency=0.05)
+    search = CachedWebSearch(client, ttl=60)
+
+    async def run():
+        return await asyncio.gather(*(search.search("Clean Air Act penalties?") for _ in range(10)))
+
+    responses = asyncio.run(run())
+
+    assert client.calls == 1
+    assert all(response is responses[0] for response in responses)
+    assert search.stats()["misses"] == 1
+    assert search.stats()["coalesced"] == 9
+
+
+def test_normalized_repeats_are_served_from_cache():
+    client = FakeTavilyClient(latency=0)
+    search = CachedWebSearch(client, ttl=60)
+
+    async def run():
+        await search.search("Clean Air Act penalties?")
+        await search.search("  clean air act PENALTIES ")
+
+    asyncio.run(run())
+
+    assert client.calls == 1
+    assert search.stats()["hits"] == 1
+
+
+def test_expired_entries_are_fetched_again(monkeypatch):
+    client = FakeTavilyClient(latency=0)
+    search = CachedWebSearch(client, ttl=60)
+    now = [1000.0]
+    monkeypatch.setattr(web_search.time, "time", lambda : now[0])
+
+    asyncio.run(search.search("FMLA eligibility"))
+    now[0] += 59
+    asyncio.run(search.search("FMLA eligibility"))
+    assert client.calls == 1
+
+    now[0] += 2
+    asyncio.run(search.search("FMLA eligibility"))
+    assert client.calls == 2
+    assert search.stats()["misses"] == 2
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    client = FakeTavilyClient(latency=0.05)
+    search = CachedWebSearch(client, ttl=60)
+
+    async def run():
+        impatient = asyncio.ensure_future(asyncio.wait_for(search.search("HIPAA"), timeout=0.01))
+        patient = asyncio.ensure_future(search.search("HIPAA"))
+        results = await asyncio.gather(impatient, patient, return_exceptions=True)
+        return results
+
+    impatient, patient = asyncio.run(run())
+
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient["query"] == "HIPAA"
+    assert client.calls == 1
+
+
+def test_size_bound_evicts_oldest():
+    client = FakeTavilyClient(latency=0)
+    search = CachedWebSearch(client, ttl=60, max_entries=2)
+
+    async def run():
+        for query in ("a", "b", "c", "a"):
+            await search.search(query)
+
+    asyncio.run(run())
+
+    assert search.stats()["entries"] == 2
+    assert client.calls == 4